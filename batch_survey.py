@@ -0,0 +1,146 @@
+"""Generate datasets of synthetic radiation surveys without a display.
+
+Each level is a randomized building with hidden sources, surveyed headlessly by a
+scripted detector path. The dataset is one directory holding an .npy file per array,
+each preallocated for every level before the run starts. Levels are fanned out over a
+process pool in chunks, and every worker memory-maps the files and writes its chunk's
+slice of them in place, so nothing is merged afterwards and only the slice bounds go
+back to the parent:
+
+    python batch_survey.py --levels 100000 --out surveys --mode ground
+
+For N levels the dataset holds:
+- count_data.npy: (N, GRID_HEIGHT, GRID_WIDTH) float32 readings (0 where not visited)
+- visited.npy: (N, GRID_HEIGHT, GRID_WIDTH) bool mask of measured tiles
+- walls.npy: (N, GRID_HEIGHT, GRID_WIDTH) bool wall mask
+- sources.npy: (N, max_sources, 2) int16 source (x, y), padded with -1
+- num_sources.npy: (N,) number of real sources per level
+- seeds.npy: (N,) seed each level was generated from
+- dataset.json: mode, grid size, source limit and level count
+
+load_dataset(out_dir) maps it back without reading it into memory.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from raycast import wall_grid
+from simulation import Simulation
+
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def random_walk_moves(sim, rng, turn_probability=0.15):
+    """Yield moves for a walk that keeps its heading and turns at random or when blocked."""
+    dx, dy = DIRECTIONS[rng.integers(len(DIRECTIONS))]
+    while True:
+        if rng.random() < turn_probability or not sim.can_enter(sim.car_x + dx, sim.car_y + dy):
+            dx, dy = DIRECTIONS[rng.integers(len(DIRECTIONS))]
+        yield dx, dy
+
+
+def run_level(seed, GRID_WIDTH, GRID_HEIGHT, mode, max_sources):
+    """Survey one randomized level and return (count_data, visited, walls, sources).
+    Everything, the walk included, is drawn from one Generator seeded with seed."""
+    rng = np.random.default_rng(seed)
+    sim = Simulation(GRID_WIDTH, GRID_HEIGHT, mode=mode, max_sources=max_sources, rng=rng)
+    count_data = sim.run(random_walk_moves(sim, rng))
+    visited = np.zeros((GRID_HEIGHT, GRID_WIDTH), dtype=bool)
+    if sim.visited_tiles:
+        vx, vy = np.array(list(sim.visited_tiles)).T
+        visited[vy, vx] = True
+    walls = wall_grid(sim.building_features, GRID_WIDTH, GRID_HEIGHT)
+    return count_data, visited, walls, sim.sources
+
+
+def dataset_arrays(levels, GRID_WIDTH, GRID_HEIGHT, max_sources):
+    """Return {name: (shape, dtype)} for every array of a dataset of the given size."""
+    grid = (levels, GRID_HEIGHT, GRID_WIDTH)
+    return {
+        "count_data": (grid, np.float32),
+        "visited": (grid, bool),
+        "walls": (grid, bool),
+        "sources": ((levels, max_sources, 2), np.int16),
+        "num_sources": ((levels,), np.int16),
+        "seeds": ((levels,), np.int64),
+    }
+
+
+def create_dataset(out_dir, levels, GRID_WIDTH, GRID_HEIGHT, mode, max_sources):
+    """Preallocate the .npy files and dataset.json of a dataset in out_dir."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, (shape, dtype) in dataset_arrays(levels, GRID_WIDTH, GRID_HEIGHT, max_sources).items():
+        array = np.lib.format.open_memmap(os.path.join(out_dir, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape)
+        if name == "sources":
+            array[:] = -1
+        array.flush()
+        del array
+    with open(os.path.join(out_dir, "dataset.json"), "w") as f:
+        json.dump({"mode": mode, "grid_width": GRID_WIDTH, "grid_height": GRID_HEIGHT,
+                   "max_sources": max_sources, "levels": levels}, f, indent=1)
+
+
+def load_dataset(out_dir, mmap_mode="r"):
+    """Return (meta, arrays) for the dataset in out_dir: the dataset.json dict and the
+    arrays by name, memory-mapped with mmap_mode (None reads them into memory)."""
+    with open(os.path.join(out_dir, "dataset.json")) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+              for name in dataset_arrays(0, 0, 0, 0)}
+    return meta, arrays
+
+
+def run_chunk(start, seeds, out_dir, GRID_WIDTH, GRID_HEIGHT, mode, max_sources):
+    """Survey every level in a chunk and write them to levels start onwards of the dataset
+    in out_dir. Returns (start, level count)."""
+    _, arrays = load_dataset(out_dir, mmap_mode="r+")
+    count_data, visited, walls = arrays["count_data"], arrays["visited"], arrays["walls"]
+    sources, num_sources = arrays["sources"], arrays["num_sources"]
+
+    for i, seed in enumerate(seeds, start):
+        count_data[i], visited[i], walls[i], level_sources = run_level(
+            seed, GRID_WIDTH, GRID_HEIGHT, mode, max_sources)
+        sources[i, :len(level_sources)] = level_sources
+        num_sources[i] = len(level_sources)
+    arrays["seeds"][start:start + len(seeds)] = seeds
+
+    for array in arrays.values():
+        array.flush()
+    return start, len(seeds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a dataset of headless radiation surveys.")
+    parser.add_argument("--levels", type=int, default=1000, help="number of levels to survey")
+    parser.add_argument("--out", default="surveys", help="output directory of the dataset")
+    parser.add_argument("--mode", choices=["ground", "aerial"], default="ground")
+    parser.add_argument("--width", type=int, default=64, help="grid width in cells")
+    parser.add_argument("--height", type=int, default=36, help="grid height in cells")
+    parser.add_argument("--max-sources", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=500, help="levels per worker task")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first level; level i uses seed + i")
+    args = parser.parse_args(argv)
+
+    create_dataset(args.out, args.levels, args.width, args.height, args.mode, args.max_sources)
+    seeds = list(range(args.seed, args.seed + args.levels))
+
+    start = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(run_chunk, i, seeds[i:i + args.chunk_size], args.out, args.width,
+                                   args.height, args.mode, args.max_sources)
+                   for i in range(0, len(seeds), args.chunk_size)]
+        for future in as_completed(futures):
+            first, n = future.result()
+            done += n
+            print(f"levels {first}-{first + n - 1} ({done}/{args.levels})")
+
+    elapsed = time.perf_counter() - start
+    print(f"Surveyed {done} levels into {args.out} in {elapsed:.1f} s ({done / max(elapsed, 1e-9):.0f} levels/s)")
+
+
+if __name__ == "__main__":
+    main()
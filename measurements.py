@@ -0,0 +1,140 @@
+"""Storage for every detector reading taken during a mapping level.
+
+The game used to keep one dense (GRID_HEIGHT, GRID_WIDTH) array and overwrite a tile's
+reading on every visit, throwing away repeated passes. A MeasurementStore instead appends
+each reading as one MEASUREMENT_DTYPE record, so its memory grows with the number of
+samples rather than the grid size, and builds per-tile views from them on demand:
+
+    store.last()            latest reading of every tile, as the game used to keep
+    store.mean()            average of all readings of every tile
+    store.max()             highest reading of every tile
+    store.sample_count()    number of readings of every tile
+    store.tile_stats()      all of the above for the visited tiles only
+
+Averaging repeated passes over a tile cuts its Poisson noise by the square root of the
+number of passes, so mean() is what the final heatmap is drawn from.
+"""
+import numpy as np
+
+# One record per reading
+MEASUREMENT_DTYPE = np.dtype([
+    ("tick", np.uint32),        # tick number since the level started
+    ("time_ms", np.uint32),     # ms of play since the timer started
+    ("x", np.int16),            # detector cell
+    ("y", np.int16),
+    ("counts", np.uint16),      # reading taken this tick, capped at 10000 by the game
+])
+
+# One record per visited tile, as returned by MeasurementStore.tile_stats()
+TILE_DTYPE = np.dtype([
+    ("x", np.int16),
+    ("y", np.int16),
+    ("samples", np.uint32),
+    ("last", np.float64),
+    ("mean", np.float64),
+    ("max", np.float64),
+])
+
+
+class MeasurementStore:
+    """Append-only, array-backed log of the readings of one level.
+
+    Records go into fixed-size chunks that are allocated as they fill, so appending never
+    copies what is already stored. The per-tile views are computed from the records when
+    asked for and the latest result is kept until the next append."""
+
+    __slots__ = ("GRID_WIDTH", "GRID_HEIGHT", "chunk_size", "ticks", "_chunks", "_filled", "_stats")
+
+    def __init__(self, GRID_WIDTH, GRID_HEIGHT, chunk_size=1024):
+        self.GRID_WIDTH = GRID_WIDTH
+        self.GRID_HEIGHT = GRID_HEIGHT
+        self.chunk_size = chunk_size
+        self.ticks = 0
+        self._chunks = [np.empty(chunk_size, dtype=MEASUREMENT_DTYPE)]
+        self._filled = 0
+        self._stats = None
+
+    @classmethod
+    def from_records(cls, records, GRID_WIDTH, GRID_HEIGHT):
+        """Return a store holding an existing MEASUREMENT_DTYPE array, e.g. a loaded session."""
+        store = cls(GRID_WIDTH, GRID_HEIGHT, chunk_size=max(1, len(records)))
+        store._chunks = [np.asarray(records, dtype=MEASUREMENT_DTYPE)]
+        store._filled = len(records)
+        store.ticks = len(records)
+        return store
+
+    def __len__(self):
+        return self.ticks
+
+    def append(self, time_ms, x, y, counts):
+        """Record one reading."""
+        if self._filled == self.chunk_size:
+            self._chunks.append(np.empty(self.chunk_size, dtype=MEASUREMENT_DTYPE))
+            self._filled = 0
+        self._chunks[-1][self._filled] = (self.ticks, time_ms, x, y, counts)
+        self._filled += 1
+        self.ticks += 1
+        self._stats = None
+
+    def resize(self, GRID_WIDTH, GRID_HEIGHT):
+        """Change the grid the views are built on. Readings outside it are kept but not shown."""
+        self.GRID_WIDTH = GRID_WIDTH
+        self.GRID_HEIGHT = GRID_HEIGHT
+        self._stats = None
+
+    def records(self):
+        """Return all records so far as one MEASUREMENT_DTYPE array."""
+        if len(self._chunks) == 1:
+            return self._chunks[0][:self._filled]
+        return np.concatenate(self._chunks[:-1] + [self._chunks[-1][:self._filled]])
+
+    def tile_stats(self, tick=None):
+        """Return a TILE_DTYPE array with one entry per visited tile, from the readings up to
+        and including tick (default: all of them)."""
+        if tick is None and self._stats is not None:
+            return self._stats
+        records = self.records()
+        if tick is not None:
+            records = records[:tick + 1]
+        records = records[(records["x"] < self.GRID_WIDTH) & (records["y"] < self.GRID_HEIGHT)]
+        cells = records["y"].astype(np.intp) * self.GRID_WIDTH + records["x"]
+        # A stable sort groups the readings by tile and keeps each tile's in time order
+        order = np.argsort(cells, kind="stable")
+        cells = cells[order]
+        counts = records["counts"][order].astype(np.float64)
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]]) if len(cells) else np.empty(0, np.intp)
+        ends = np.r_[starts[1:], len(cells)]
+
+        stats = np.empty(len(starts), dtype=TILE_DTYPE)
+        stats["x"] = cells[starts] % self.GRID_WIDTH
+        stats["y"] = cells[starts] // self.GRID_WIDTH
+        stats["samples"] = ends - starts
+        if len(starts):
+            stats["last"] = counts[ends - 1]
+            stats["mean"] = np.add.reduceat(counts, starts) / stats["samples"]
+            stats["max"] = np.maximum.reduceat(counts, starts)
+        if tick is None:
+            self._stats = stats
+        return stats
+
+    def _dense(self, field, tick, dtype=np.float64):
+        stats = self.tile_stats(tick)
+        grid = np.zeros((self.GRID_HEIGHT, self.GRID_WIDTH), dtype=dtype)
+        grid[stats["y"], stats["x"]] = stats[field]
+        return grid
+
+    def last(self, tick=None):
+        """Return the (GRID_HEIGHT, GRID_WIDTH) map of the latest reading of every tile, 0 where unvisited."""
+        return self._dense("last", tick)
+
+    def mean(self, tick=None):
+        """Return the (GRID_HEIGHT, GRID_WIDTH) map of the mean reading of every tile, 0 where unvisited."""
+        return self._dense("mean", tick)
+
+    def max(self, tick=None):
+        """Return the (GRID_HEIGHT, GRID_WIDTH) map of the highest reading of every tile, 0 where unvisited."""
+        return self._dense("max", tick)
+
+    def sample_count(self, tick=None):
+        """Return the (GRID_HEIGHT, GRID_WIDTH) map of the number of readings of every tile."""
+        return self._dense("samples", tick, dtype=np.int64)
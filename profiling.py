@@ -0,0 +1,121 @@
+"""Timing instrumentation for tracking start-up time and per-frame cost."""
+import atexit
+import contextlib
+import csv
+import sys
+import time
+import numpy as np
+
+
+class StartupProfiler:
+    """Records how long each named start-up phase takes and reports the totals.
+
+    Use phase() as a context manager around each stage, or add() for a duration measured
+    elsewhere (e.g. module imports, which run before the profiler can exist)."""
+
+    def __init__(self):
+        self.phases = []
+        self.start = time.perf_counter()
+        self.reported = False
+
+    def add(self, name, seconds):
+        self.phases.append((name, seconds))
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def report(self):
+        """Return the phase timings as a printable multi-line string."""
+        total = sum(seconds for _, seconds in self.phases)
+        width = max([len(name) for name, _ in self.phases] + [5])
+        lines = [f"Startup profile ({time.strftime('%Y-%m-%d %H:%M:%S')})"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<{width}}  {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'total':<{width}}  {total * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def write_report(self, path):
+        """Print the report (when there is a console) and append it to a log file, once."""
+        if self.reported:
+            return
+        self.reported = True
+        text = self.report()
+        if sys.stdout is not None:
+            print(text)
+        with open(path, "a") as log:
+            log.write(text + "\n")
+
+
+# Sections of one pass of the main() loop, in the order they run. "wait" is the time
+# clock.tick() sleeps to hold the frame rate, i.e. the budget left over.
+FRAME_SECTIONS = ("events", "state", "update", "world", "hud", "overlays", "display", "wait")
+
+
+class FrameTimer:
+    """Splits every frame of the game loop into sections and keeps rolling timings.
+
+    Call start_frame() at the top of the loop and mark(section) at the end of each
+    section; the time since the previous mark is charged to that section. The last
+    `window` frames are kept in a ring buffer for percentiles(). If csv_path is given,
+    every frame is also written to that CSV file, in milliseconds."""
+
+    def __init__(self, sections=FRAME_SECTIONS, window=300, csv_path=None):
+        self.sections = tuple(sections)
+        self._column = {name: i for i, name in enumerate(self.sections)}
+        # One row per frame: the sections, then busy (everything but waiting) and total
+        self.columns = self.sections + ("busy", "total")
+        self.samples = np.zeros((window, len(self.columns)))
+        self.frames = 0
+        self._row = np.zeros(len(self.columns))
+        self._frame_start = None
+        self._last_mark = None
+
+        self._csv_file = None
+        if csv_path is not None:
+            self._csv_file = open(csv_path, "w", newline="")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(["frame"] + [f"{name}_ms" for name in self.columns])
+            atexit.register(self.close)
+
+    def start_frame(self):
+        """Begin a new frame, closing the previous one."""
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self._finish_frame(now)
+        self._row[:] = 0
+        self._frame_start = self._last_mark = now
+
+    def mark(self, section):
+        """Charge the time since the previous mark (or the frame start) to section."""
+        now = time.perf_counter()
+        if self._frame_start is None:
+            return
+        self._row[self._column[section]] += now - self._last_mark
+        self._last_mark = now
+
+    def _finish_frame(self, now):
+        total = now - self._frame_start
+        self._row[-1] = total
+        self._row[-2] = total - self._row[self._column["wait"]] if "wait" in self._column else total
+        self.samples[self.frames % len(self.samples)] = self._row
+        self.frames += 1
+        if self._csv_file is not None:
+            self._csv.writerow([self.frames] + [f"{value * 1000:.3f}" for value in self._row])
+
+    def percentiles(self, q=(50, 95, 99)):
+        """Return {column: (p50, p95, p99)} in milliseconds over the rolling window."""
+        filled = self.samples[:min(self.frames, len(self.samples))]
+        if len(filled) == 0:
+            return {name: tuple(0.0 for _ in q) for name in self.columns}
+        values = np.percentile(filled, q, axis=0) * 1000
+        return {name: tuple(float(v) for v in values[:, i]) for i, name in enumerate(self.columns)}
+
+    def close(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
@@ -1,13 +1,65 @@
+import time
+_IMPORT_START = time.perf_counter()
 import pygame
 import sys
-import time
-import random
-import math
-import os
+import argparse
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import matplotlib.pyplot as plt
+from raycast import wall_grid, visibility_mask
+from spectra import ISOTOPES, ENERGY_BINS, SpectrumAccumulator, export_spectrum_png_async
+from identification import identify_isotope
+from localization import localize_sources, match_estimates
+from scoring import score_survey, record_score, top_scores
+from interpolation import FieldInterpolator
+from spatial_index import SpatialIndex
+from simulation import (generate_random_building, generate_level, compute_count_rate_field,
+                        build_transmission_cache, distance_squared)
+from profiling import StartupProfiler, FrameTimer
+from session_log import SessionRecorder, Session
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+
+# Also write each measured spectrum to plots/ as a PNG (done on a background thread)
+EXPORT_SPECTRUM_PNGS = False
+
+
+FONT_PATH = "font/PixeloidMono-d94EV.ttf"
+
+# Spectra are rendered on a worker thread and SDL_ttf is not thread-safe, so all font
+# loading and text rendering goes through this lock
+_TEXT_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _load_font(size, path):
+    return pygame.font.Font(path, size)
+
+
+def get_font(size, path=FONT_PATH):
+    """Return the shared pygame Font for (path, size), loading it from disk only once."""
+    with _TEXT_LOCK:
+        return _load_font(size, path)
+
+
+@functools.lru_cache(maxsize=1024)
+def _render_text_cached(font, text, antialias, color):
+    return font.render(text, antialias, color)
 
-os.makedirs("plots", exist_ok=True)
+
+def render_text(font, text, antialias, color):
+    """Cached font.render(); static labels are rasterized once and reused every frame.
+    The returned surface is shared, so callers must only blit it, never draw on it.
+    Only use it for fixed text: strings built from values that change every frame or
+    every level would push the static labels out of the cache."""
+    with _TEXT_LOCK:
+        return _render_text_cached(font, text, antialias, color)
+
+
+def render_dynamic_text(font, text, antialias, color):
+    """Uncached font.render() under the text lock, for strings built from changing values."""
+    with _TEXT_LOCK:
+        return font.render(text, antialias, color)
 
 
 class Button:
@@ -18,15 +70,15 @@ class Button:
 
     def draw(self, screen, FONT_COLOR):
         pygame.draw.rect(screen, (150, 150, 150), self.rect)
-        font = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 20)
-        text_surface = font.render(self.text, True, FONT_COLOR)
+        font = get_font(20)
+        text_surface = render_text(font, self.text, True, FONT_COLOR)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
 
     def draw_hovered(self, screen, FONT_COLOR):
         pygame.draw.rect(screen, (255, 0, 0), self.rect)
-        font = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 20)
-        text_surface = font.render(self.text, True, FONT_COLOR)
+        font = get_font(20)
+        text_surface = render_text(font, self.text, True, FONT_COLOR)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
 
@@ -87,39 +139,10 @@ def counts_to_hot_rgb_array(counts, min_count, max_count):
     return rgb_array
 
 
-def has_line_of_sight(source_x, source_y, target_x, target_y, wall_positions):
-    """Check line of sight using Bresenham's line algorithm."""
-    x0, y0 = source_x, source_y
-    x1, y1 = target_x, target_y
-    dx = abs(x1 - x0)
-    dy = abs(y1 - y0)
-    sx = 1 if x0 < x1 else -1
-    sy = 1 if y0 < y1 else -1
-    err = dx - dy
-
-    while True:
-        if (x0, y0) != (source_x, source_y) and (x0, y0) != (target_x, target_y):
-            if (x0, y0) in wall_positions:
-                return False
-        if x0 == x1 and y0 == y1:
-            break
-        e2 = 2 * err
-        if e2 > -dy:
-            err -= dy
-            x0 += sx
-        if e2 < dx:
-            err += dx
-            y0 += sy
-
-    return True
-
-
-def distance_squared(x1, y1, x2, y2):
-    return ((x2 - x1) ** 2 + (y2 - y1) ** 2) + 0.1
-
-
-def distance_squared_3D(x1, y1, x2, y2):
-    return ((x2 - x1) ** 2 + (y2 - y1) ** 2 + 10 ** 2) + 0.1
+def counts_to_log_hot_rgb_array(counts, max_count):
+    """Like counts_to_hot_rgb_array, but on a log1p scale from 0 to max_count, which keeps
+    the faint tail of ground maps visible next to the hot spots."""
+    return counts_to_hot_rgb_array(np.log1p(counts), 0, np.log1p(max_count))
 
 
 def draw_floor(floors, screen, floor_image, CELL_SIZE):
@@ -133,13 +156,26 @@ def draw_grass(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, screen, grass_image):
             screen.blit(grass_image, (i * GRID_SIZE, j * GRID_SIZE))
 
 
+def build_level_background(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, grass_image, floor_image=None, floors=(),
+                           wall_image=None, walls=()):
+    """Bake the grass, floor and wall textures of a level into a single surface, so each
+    frame draws the static world with one blit. Rebuild it when the level or window changes."""
+    background = pygame.Surface(((GRID_WIDTH + 1) * GRID_SIZE, (GRID_HEIGHT + 1) * GRID_SIZE))
+    draw_grass(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, background, grass_image)
+    if floor_image is not None:
+        draw_floor(floors, background, floor_image, GRID_SIZE)
+    for wall in walls:
+        draw_wall(wall[0], wall[1], wall_image, GRID_SIZE, background)
+    return background.convert()
+
+
 def draw_source(source_x, source_y, CELL_SIZE, source_image, screen):
     screen.blit(source_image, (source_x * CELL_SIZE, source_y * CELL_SIZE))
 
 
 def draw_counts(counts, x, y, screen):
-    font = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 24)
-    text1 = font.render(f"CPS: {counts:.0f}", True, (255, 0, 0))
+    font = get_font(24)
+    text1 = render_dynamic_text(font, f"CPS: {counts:.0f}", True, (255, 0, 0))
 
     # black rectangle with grey fill
     pygame.draw.rect(screen, (0, 0, 0), (text1.get_height()//2, -2+text1.get_height()//2, text1.get_width() + 10, text1.get_height() + 10))
@@ -148,8 +184,8 @@ def draw_counts(counts, x, y, screen):
 
 
 def draw_menu(FONT_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, screen, trefoil_image):
-    font = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 2 * FONT_SIZE)
-    text1 = font.render("Radmapper V1.7", True, (255, 105, 180))
+    font = get_font(2 * FONT_SIZE)
+    text1 = render_text(font, "Radmapper V1.7", True, (255, 105, 180))
     screen.blit(text1,
                 (SCREEN_WIDTH // 2 - text1.get_width() // 2, SCREEN_HEIGHT - (SCREEN_HEIGHT / 70) * text1.get_height()))
     screen.blit(trefoil_image, (SCREEN_WIDTH // 2 - trefoil_image.get_width() // 2, SCREEN_HEIGHT - (
@@ -158,41 +194,41 @@ def draw_menu(FONT_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, screen, trefoil_image):
 
 def draw_show_maps(screen, SCREEN_WIDTH, SCREEN_HEIGHT, FONT_SIZE):
     screen.fill((255, 255, 255))
-    font = pygame.font.Font("font/PixeloidMono-d94EV.ttf", FONT_SIZE)
-    text1 = font.render("Ground Map", True, (0, 0, 0))
-    text2 = font.render("Aerial Map", True, (0, 0, 0))
+    font = get_font(FONT_SIZE)
+    text1 = render_text(font, "Ground Map", True, (0, 0, 0))
+    text2 = render_text(font, "Aerial Map", True, (0, 0, 0))
     screen.blit(text1, (SCREEN_WIDTH // 4 - text1.get_width() // 2, 2 * text1.get_height()))
     screen.blit(text2, (3 * SCREEN_WIDTH // 4 - text2.get_width() // 2, 2 * text2.get_height()))
 
 
-def _hot_color(frac):
-    """Return an (R, G, B) tuple for a value 0-1 using the 'hot' colormap."""
-    if frac < 1/3:
-        return (int(frac * 3 * 255), 0, 0)
-    elif frac < 2/3:
-        return (255, int((frac - 1/3) * 3 * 255), 0)
-    else:
-        return (255, 255, int((frac - 2/3) * 3 * 255))
-
-
-def _draw_outlined_text(surface, font, text, x, y, fg=(255, 255, 255), outline=(0, 0, 0)):
-    """Draw text with a 1-pixel black outline for readability."""
+def _draw_outlined_text(surface, font, text, x, y, fg=(255, 255, 255), outline=(0, 0, 0), dynamic=False):
+    """Draw text with a 1-pixel black outline for readability. Pass dynamic=True for text
+    built from changing values, so it bypasses the render_text cache."""
+    render = render_dynamic_text if dynamic else render_text
+    outline_text = render(font, text, True, outline)
     for dx in (-1, 0, 1):
         for dy in (-1, 0, 1):
             if dx or dy:
-                surface.blit(font.render(text, True, outline), (x + dx, y + dy))
-    surface.blit(font.render(text, True, fg), (x, y))
+                surface.blit(outline_text, (x + dx, y + dy))
+    surface.blit(render(font, text, True, fg), (x, y))
 
 
 def render_heatmap_surface(width, height, count_data, floors, wall_positions,
-                           max_cps, source_positions=None, is_aerial=False):
+                           max_cps, source_positions=None, is_aerial=False, estimates=None, measured_mask=None):
     """Render a heatmap surface with color scale bar.
     source_positions can be None, a single (x,y) tuple, or a list of (x,y) tuples.
+    estimates is an optional list of localize_sources() results, drawn as crosshairs
+    circled by their uncertainty; with source_positions they are also joined to the
+    source they were matched to and labelled with their error in tiles.
+    measured_mask marks the tiles that were actually measured when count_data has been
+    filled in by a FieldInterpolator; the other tiles are drawn dimmed.
     Returns a pygame.Surface of size (width, height)."""
     grid_h, grid_w = count_data.shape
     # Reserve space for the color bar + labels on the right
-    label_font = pygame.font.Font("font/PixeloidMono-d94EV.ttf", max(10, width // 70))
-    max_label_w = label_font.size(f"{int(max_cps)}")[0]
+    label_font = get_font(max(10, width // 70))
+    # Font.size() goes through SDL_ttf too, so it needs the lock like any render
+    with _TEXT_LOCK:
+        max_label_w = label_font.size(f"{int(max_cps)}")[0]
     actual_bar_w = max(12, width // 36)
     bar_margin = 6
     right_reserve = bar_margin + actual_bar_w + 4 + max_label_w + bar_margin
@@ -205,35 +241,27 @@ def render_heatmap_surface(width, height, count_data, floors, wall_positions,
     sx = map_w / grid_w
     sy = map_h / grid_h
 
-    floors_set = set(floors) if not isinstance(floors, set) else floors
-
-    # Draw floor
-    for (fx, fy) in floors_set:
-        mx = int(fx * sx)
-        my = int(fy * sy)
-        pygame.draw.rect(surface, (50, 50, 50),
-            (mx, my, max(1, int(sx)), max(1, int(sy))))
-
-    # Draw heatmap tiles using 'hot' colormap style
-    for fy in range(grid_h):
-        for fx in range(grid_w):
-            cv = count_data[fy, fx]
-            if cv > 0 and (fx, fy) in floors_set:
-                if is_aerial:
-                    intensity = min(1.0, cv / max_cps)
-                else:
-                    intensity = min(1.0, math.log1p(cv) / math.log1p(max_cps))
-                mx = int(fx * sx)
-                my = int(fy * sy)
-                pygame.draw.rect(surface, _hot_color(intensity),
-                    (mx, my, max(1, int(sx)), max(1, int(sy))))
-
-    # Draw walls
-    for (wx, wy) in wall_positions:
-        mx = int(wx * sx)
-        my = int(wy * sy)
-        pygame.draw.rect(surface, (180, 180, 180),
-            (mx, my, max(1, int(sx)), max(1, int(sy))))
+    # Build the whole map one pixel per tile, then scale it up in a single pass.
+    # wall_grid rasterizes any collection of cells, floors included.
+    floor_mask = wall_grid(floors, grid_w, grid_h)
+    wall_mask = wall_grid(wall_positions, grid_w, grid_h)
+    if is_aerial:
+        heat_rgb = counts_to_hot_rgb_array(count_data, 0, max_cps)
+    else:
+        heat_rgb = counts_to_log_hot_rgb_array(count_data, max_cps)
+
+    tiles = np.empty((grid_h, grid_w, 3), dtype=np.uint8)
+    tiles[:] = (30, 30, 30)
+    tiles[floor_mask] = (50, 50, 50)
+    heat_mask = floor_mask & (count_data > 0)
+    tiles[heat_mask] = heat_rgb[heat_mask]
+    if measured_mask is not None:
+        estimated = heat_mask & ~measured_mask
+        tiles[estimated] = tiles[estimated] * 0.6
+    tiles[wall_mask] = (180, 180, 180)
+
+    map_surface = pygame.surfarray.make_surface(tiles.transpose(1, 0, 2))
+    surface.blit(pygame.transform.scale(map_surface, (map_w, map_h)), (0, 0))
 
     # Draw source markers if provided
     if source_positions is not None:
@@ -249,16 +277,46 @@ def render_heatmap_surface(width, height, count_data, floors, wall_positions,
             pygame.draw.circle(surface, (0, 255, 0), (spx, spy), radius)
             pygame.draw.circle(surface, (0, 0, 0), (spx, spy), radius, 2)
 
+    # Draw estimated source positions if provided
+    if estimates is not None:
+        if source_positions is not None:
+            matched = match_estimates(estimates, positions)
+        else:
+            matched = [(estimate, None, None) for estimate in estimates]
+        errors = []
+        for (ex, ey, _, uncertainty), source, error in matched:
+            epx = int(ex * sx + sx / 2)
+            epy = int(ey * sy + sy / 2)
+            arm = max(5, int(min(sx, sy) * 0.6))
+            if source is not None:
+                pygame.draw.line(surface, (0, 255, 255), (epx, epy),
+                                 (int(source[0] * sx + sx / 2), int(source[1] * sy + sy / 2)), 2)
+                _draw_outlined_text(surface, label_font, f"{error:.1f}", epx + arm + 2, epy - arm - 2,
+                                    fg=(0, 255, 255), dynamic=True)
+                errors.append(error)
+            pygame.draw.circle(surface, (0, 255, 255), (epx, epy),
+                               max(arm, int(uncertainty * min(sx, sy))), 2)
+            pygame.draw.line(surface, (0, 255, 255), (epx - arm, epy), (epx + arm, epy), 2)
+            pygame.draw.line(surface, (0, 255, 255), (epx, epy - arm), (epx, epy + arm), 2)
+        summary = f"Estimated sources: {len(estimates)}"
+        if errors:
+            summary += f"   mean error: {np.mean(errors):.1f} tiles"
+        _draw_outlined_text(surface, label_font, summary, 8, 8, fg=(0, 255, 255), dynamic=True)
+
+    if measured_mask is not None:
+        _draw_outlined_text(surface, label_font, "Dimmed tiles are interpolated", 8,
+                            map_h - label_font.get_height() - 8, fg=(200, 200, 200))
+
     # --- Compact color scale bar ---
     bar_x = map_w + bar_margin
     bar_y_top = 40
     bar_y_bot = map_h - 30
     bar_h = bar_y_bot - bar_y_top
 
-    for i in range(bar_h):
-        frac = 1.0 - i / bar_h
-        pygame.draw.line(surface, _hot_color(frac),
-            (bar_x, bar_y_top + i), (bar_x + actual_bar_w, bar_y_top + i))
+    bar_fracs = 1.0 - np.arange(bar_h) / bar_h
+    bar_rgb = counts_to_hot_rgb_array(bar_fracs, 0, 1)[np.newaxis]
+    bar_surface = pygame.surfarray.make_surface(bar_rgb)
+    surface.blit(pygame.transform.scale(bar_surface, (actual_bar_w + 1, bar_h)), (bar_x, bar_y_top))
 
     pygame.draw.rect(surface, (200, 200, 200),
         (bar_x, bar_y_top, actual_bar_w, bar_h), 1)
@@ -266,14 +324,286 @@ def render_heatmap_surface(width, height, count_data, floors, wall_positions,
     # Labels to the right of the bar with outlined text
     lx = bar_x + actual_bar_w + 3
     _draw_outlined_text(surface, label_font, "CPS", bar_x, bar_y_top - label_font.get_height() - 4)
-    _draw_outlined_text(surface, label_font, f"{int(max_cps)}", lx, bar_y_top - 2)
+    _draw_outlined_text(surface, label_font, f"{int(max_cps)}", lx, bar_y_top - 2, dynamic=True)
     _draw_outlined_text(surface, label_font, f"{int(max_cps // 2)}", lx,
-        bar_y_top + bar_h // 2 - label_font.get_height() // 2)
+        bar_y_top + bar_h // 2 - label_font.get_height() // 2, dynamic=True)
     _draw_outlined_text(surface, label_font, "0", lx, bar_y_bot - label_font.get_height() + 2)
 
     return surface
 
 
+class Minimap:
+    """Live minimap for a mapping level. Floors and walls are baked once when the level is
+    created; afterwards only the tile just measured is repainted, so the per-frame cost does
+    not grow with the number of visited tiles."""
+
+    def __init__(self, width, GRID_WIDTH, GRID_HEIGHT, floors, walls, max_cps):
+        self.width = width
+        self.height = int(width * GRID_HEIGHT / GRID_WIDTH)
+        self.scale_x = self.width / GRID_WIDTH
+        self.scale_y = self.height / GRID_HEIGHT
+        self.max_cps = max_cps
+        self.walls = set(walls)
+        self.floor_mask = wall_grid(floors, GRID_WIDTH, GRID_HEIGHT)
+        self.wall_mask = wall_grid(self.walls, GRID_WIDTH, GRID_HEIGHT)
+
+        self.surface = pygame.Surface((self.width, self.height))
+        self.surface.fill((30, 30, 30))
+        for (fx, fy) in floors:
+            pygame.draw.rect(self.surface, (60, 60, 60), self._tile_rect(fx, fy))
+        for (wx, wy) in self.walls:
+            pygame.draw.rect(self.surface, (180, 180, 180), self._tile_rect(wx, wy))
+
+    def _tile_rect(self, x, y):
+        return (int(x * self.scale_x), int(y * self.scale_y),
+                max(1, int(self.scale_x)), max(1, int(self.scale_y)))
+
+    def update_tile(self, x, y, counts):
+        """Paint a measured tile with its heat colour. Walls stay on top, as the drone can
+        fly over them."""
+        if (x, y) in self.walls:
+            return
+        intensity = min(1.0, counts / self.max_cps)
+        color = (int(255 * intensity), 50, int(255 * (1 - intensity)))
+        pygame.draw.rect(self.surface, color, self._tile_rect(x, y))
+
+    def paint_field(self, field, measured):
+        """Repaint every tile from a (GRID_HEIGHT, GRID_WIDTH) field in one pass, e.g. a
+        FieldInterpolator estimate. Tiles that were not measured are drawn dimmed."""
+        intensity = np.minimum(1.0, field / self.max_cps)
+        heat = np.stack([255 * intensity, np.full_like(intensity, 50), 255 * (1 - intensity)], axis=-1)
+        heat[~measured] *= 0.55
+
+        tiles = np.empty(field.shape + (3,), dtype=np.uint8)
+        tiles[:] = (30, 30, 30)
+        tiles[self.floor_mask] = (60, 60, 60)
+        painted = measured | (field > 0)
+        tiles[painted] = heat[painted]
+        tiles[self.wall_mask] = (180, 180, 180)
+        tile_surface = pygame.surfarray.make_surface(tiles.transpose(1, 0, 2))
+        self.surface.blit(pygame.transform.scale(tile_surface, (self.width, self.height)), (0, 0))
+
+    def draw(self, screen, x, y, car_x, car_y):
+        """Blit the minimap with its border at (x, y) and mark the player position."""
+        border_rect = pygame.Rect(x - 2, y - 2, self.width + 4, self.height + 4)
+        pygame.draw.rect(screen, (255, 255, 255), border_rect, 2)
+        screen.blit(self.surface, (x, y))
+        player_pos = (x + int(car_x * self.scale_x), y + int(car_y * self.scale_y))
+        screen.set_clip(pygame.Rect(x, y, self.width, self.height))
+        pygame.draw.circle(screen, (0, 255, 0), player_pos, 3)
+        screen.set_clip(None)
+
+
+def get_cached_heatmap_surface(heatmap_entry, width, height):
+    """Return the rendered heatmap for a last_heatmap_data entry at the given size.
+    The surface is kept in the entry, keyed by map identity, size and max value, so it is
+    only re-rendered when a new survey replaces the entry or the window size changes."""
+    cache = heatmap_entry.setdefault('surface_cache', {})
+    key = (id(heatmap_entry['count_data']), width, height, heatmap_entry['max_v'])
+    if key not in cache:
+        cache.clear()
+        cache[key] = render_heatmap_surface(
+            width, height, heatmap_entry['count_data'], heatmap_entry['floors'],
+            heatmap_entry['walls'], heatmap_entry['max_v'], heatmap_entry['source_positions'],
+            heatmap_entry['is_aerial'], heatmap_entry.get('estimates'), heatmap_entry.get('measured'))
+    return cache[key]
+
+
+def _nice_tick_step(span, target_ticks=6):
+    """Return a 1/2/5 x 10^n tick spacing giving roughly target_ticks ticks over span."""
+    raw = max(span, 1e-9) / target_ticks
+    magnitude = 10 ** np.floor(np.log10(raw))
+    for multiple in (1, 2, 5, 10):
+        if multiple * magnitude >= raw:
+            return multiple * magnitude
+    return 10 * magnitude
+
+
+def render_spectrum_surface(energy_bins, spectrum, isotope, width, height, subtitle=None, title=None):
+    """Draw a measured spectrum with axes, grid and peak annotations straight onto a
+    pygame.Surface of size (width, height), without going through matplotlib or disk.
+    The title names the isotope unless another is given; an optional subtitle line is
+    drawn under it."""
+    entry = ISOTOPES[isotope]
+    surface = pygame.Surface((width, height))
+    surface.fill((255, 255, 255))
+
+    title_font = get_font(max(12, height // 28))
+    label_font = get_font(max(10, height // 36))
+    tick_font = get_font(max(8, height // 48))
+    annot_font = get_font(max(8, height // 52))
+
+    # Plot area
+    left = render_text(tick_font, "00000", True, (0, 0, 0)).get_width() + label_font.get_height() + 16
+    right = width - 20
+    top = title_font.get_height() + 20
+    if subtitle is not None:
+        top += tick_font.get_height() + 4
+    bottom = height - tick_font.get_height() - label_font.get_height() - 18
+    plot_w = right - left
+    plot_h = bottom - top
+
+    x_max = entry["xlim"]
+    shown = energy_bins <= x_max
+    y_max = max(1.0, float(spectrum[shown].max()) * 1.1)
+    for energy, label, dx, y_scale, y_offset, fontsize in entry["annotations"]:
+        idx = np.argmin(np.abs(energy_bins - energy))
+        y_max = max(y_max, spectrum[idx] * y_scale + y_offset + y_max * 0.05)
+
+    def to_px(energy, counts):
+        return left + energy / x_max * plot_w, bottom - counts / y_max * plot_h
+
+    # Grid and ticks
+    x_step = _nice_tick_step(x_max)
+    y_step = _nice_tick_step(y_max)
+    for tick in np.arange(0, x_max + x_step / 2, x_step):
+        px, _ = to_px(tick, 0)
+        pygame.draw.line(surface, (225, 225, 225), (px, top), (px, bottom))
+        text = render_text(tick_font, f"{tick:.0f}", True, (0, 0, 0))
+        surface.blit(text, (px - text.get_width() // 2, bottom + 4))
+    for tick in np.arange(0, y_max, y_step):
+        _, py = to_px(0, tick)
+        pygame.draw.line(surface, (225, 225, 225), (left, py), (right, py))
+        # The count axis rescales as the spectrum fills up
+        text = render_dynamic_text(tick_font, f"{tick:.0f}", True, (0, 0, 0))
+        surface.blit(text, (left - text.get_width() - 4, py - text.get_height() // 2))
+
+    # Histogram: light fill under a blue line
+    px, py = to_px(energy_bins[shown], spectrum[shown])
+    points = np.column_stack((px, py)).tolist()
+    if len(points) > 1:
+        pygame.draw.polygon(surface, (178, 178, 255), [(px[0], bottom)] + points + [(px[-1], bottom)])
+        pygame.draw.lines(surface, (0, 0, 255), False, points)
+
+    # Peak annotations
+    for energy, label, dx, y_scale, y_offset, fontsize in entry["annotations"]:
+        idx = np.argmin(np.abs(energy_bins - energy))
+        peak = to_px(energy, spectrum[idx])
+        text_x, text_y = to_px(energy + dx, spectrum[idx] * y_scale + y_offset)
+        lines = [render_text(annot_font, line, True, (255, 0, 0)) for line in label.split("\n")]
+        text_y -= sum(line.get_height() for line in lines) // 2
+        pygame.draw.line(surface, (255, 0, 0), (text_x, text_y + lines[0].get_height() // 2), peak)
+        pygame.draw.circle(surface, (255, 0, 0), (int(peak[0]), int(peak[1])), 3)
+        for line in lines:
+            surface.blit(line, (text_x, text_y))
+            text_y += line.get_height()
+
+    # Frame, labels and title
+    pygame.draw.rect(surface, (0, 0, 0), (left, top, plot_w + 1, plot_h + 1), 1)
+    x_label = render_text(label_font, "Energy (keV)", True, (0, 0, 0))
+    surface.blit(x_label, (left + plot_w // 2 - x_label.get_width() // 2, height - x_label.get_height() - 6))
+    y_label = pygame.transform.rotate(render_text(label_font, "Counts", True, (0, 0, 0)), 90)
+    surface.blit(y_label, (4, top + plot_h // 2 - y_label.get_height() // 2))
+    if title is None:
+        title = f"Measured Spectrum: {isotope}"
+    title = render_text(title_font, title, True, (0, 0, 0))
+    surface.blit(title, (left + plot_w // 2 - title.get_width() // 2, 8))
+    if subtitle is not None:
+        sub = render_dynamic_text(tick_font, subtitle, True, (80, 80, 80))
+        surface.blit(sub, (left + plot_w // 2 - sub.get_width() // 2, 12 + title.get_height()))
+
+    return surface
+
+
+def detector_count_rate(x, y, source_x, source_y, shielded=False):
+    """Expected CPS at (x, y) from a single source plus background, as the Spectrum ID and
+    Teaching detectors see it. A shielded source reads at half strength."""
+    strength = 5000 if shielded else 10000
+    return 7 + strength / distance_squared(x, y, source_x, source_y)
+
+
+def submit_spectrum_render(spectrum_worker, acquisition, width, height, title=None):
+    """Render the current state of a spectrum acquisition on the spectrum worker.
+    Must only be called while no earlier render of the same acquisition is running."""
+    subtitle = (f"Real time {acquisition.real_time:.1f} s   Live time {acquisition.live_time:.1f} s   "
+                f"Dead time {acquisition.dead_time_fraction * 100:.0f}%   Counts {acquisition.total_counts}")
+    return spectrum_worker.submit(render_spectrum_surface, ENERGY_BINS, acquisition.take_snapshot(),
+                                  acquisition.isotope, width, height, subtitle, title)
+
+
+def finish_spectrum_acquisition(acquisition, export_path):
+    """Called when a spectrum overlay is closed; exports the accumulated spectrum if asked to."""
+    if acquisition is not None and export_path is not None:
+        export_spectrum_png_async(ENERGY_BINS, acquisition.counts, acquisition.isotope, export_path)
+
+
+def draw_spectrum_overlay(screen, SCREEN_WIDTH, SCREEN_HEIGHT, spectrum_surface, font_hud, status=None):
+    """Dim the screen and show a measured spectrum, or an "acquiring" panel while the
+    worker is still producing it. An optional status line is shown above the panel."""
+    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    overlay.fill((0, 0, 0))
+    overlay.set_alpha(150)
+    screen.blit(overlay, (0, 0))
+
+    if spectrum_surface is None:
+        panel_w, panel_h = int(SCREEN_WIDTH * 0.7), int(SCREEN_HEIGHT * 0.7)
+        sp_x = (SCREEN_WIDTH - panel_w) // 2
+        sp_y = (SCREEN_HEIGHT - panel_h) // 2
+        pygame.draw.rect(screen, (255, 255, 255), (sp_x, sp_y, panel_w, panel_h))
+        dots = "." * (1 + pygame.time.get_ticks() // 300 % 3)
+        acquiring = render_dynamic_text(font_hud, f"Acquiring spectrum{dots}", True, (0, 0, 0))
+        screen.blit(acquiring, (SCREEN_WIDTH // 2 - acquiring.get_width() // 2,
+                                SCREEN_HEIGHT // 2 - acquiring.get_height() // 2))
+    else:
+        panel_h = spectrum_surface.get_height()
+        sp_x = (SCREEN_WIDTH - spectrum_surface.get_width()) // 2
+        sp_y = (SCREEN_HEIGHT - panel_h) // 2
+        screen.blit(spectrum_surface, (sp_x, sp_y))
+
+    dismiss = render_text(font_hud, "Press SPACE or click to close", True, (255, 255, 255))
+    screen.blit(dismiss, (SCREEN_WIDTH // 2 - dismiss.get_width() // 2, sp_y + panel_h + 10))
+    if status is not None:
+        status_text = render_dynamic_text(font_hud, status, True, (255, 255, 0))
+        screen.blit(status_text, (SCREEN_WIDTH // 2 - status_text.get_width() // 2,
+                                  sp_y - status_text.get_height() - 10))
+
+
+def render_frame_stats(frame_timer, target_fps, font):
+    """Render the F3 debug panel: p50/p95/p99 of every frame section, in ms, against the
+    frame budget."""
+    lines = [f"{'ms':<9}{'p50':>7}{'p95':>7}{'p99':>7}"]
+    for name, (p50, p95, p99) in frame_timer.percentiles().items():
+        lines.append(f"{name:<9}{p50:7.2f}{p95:7.2f}{p99:7.2f}")
+    lines.append(f"budget {1000 / target_fps:.1f} ms ({target_fps} fps)")
+    # The numbers change every refresh, so bypass the render_text cache
+    with _TEXT_LOCK:
+        texts = [font.render(line, True, (0, 255, 0)) for line in lines]
+
+    panel = pygame.Surface((max(text.get_width() for text in texts) + 12,
+                            sum(text.get_height() for text in texts) + 12))
+    panel.set_alpha(200)
+    y = 6
+    for text in texts:
+        panel.blit(text, (6, y))
+        y += text.get_height()
+    return panel
+
+
+def render_score_panel(result, rank, leaders, font):
+    """Render the GAME_OVER score panel: the level's score_survey result, its leaderboard
+    rank and the top leaderboard entries of its mode."""
+    peak = "-" if result['peak_distance'] is None else f"{result['peak_distance']:.1f} tiles"
+    lines = [f"Score: {result['score']} / 1000   (#{rank})",
+             f"Coverage {100 * result['coverage']:.0f}%   Map accuracy {100 * result['accuracy']:.0f}%",
+             f"Hottest tile to source: {peak}",
+             "",
+             "Leaderboard"]
+    for place, entry in enumerate(leaders, 1):
+        lines.append(f"{place:>2}. {entry['name'][:12]:<12} {entry['score']:>5}")
+    # The numbers change every level, so bypass the render_text cache
+    with _TEXT_LOCK:
+        texts = [font.render(line, True, (255, 255, 255)) for line in lines]
+
+    panel = pygame.Surface((max(text.get_width() for text in texts) + 16,
+                            sum(text.get_height() for text in texts) + 12))
+    panel.set_alpha(210)
+    y = 6
+    for text in texts:
+        panel.blit(text, (8, y))
+        y += text.get_height()
+    return panel
+
+
 def increase_volume(current_volume):
     current_volume = min(1.0, current_volume + 0.01)  # Increase by 1%
     pygame.mixer.music.set_volume(current_volume)
@@ -286,286 +616,11 @@ def decrease_volume(current_volume):
     return current_volume
 
 
-def generate_and_save_spectrum(isotope, filepath):
-    """Generate a simulated gamma-ray spectrum for a given isotope and save as image."""
-    energy_bins = np.linspace(0, 2000, 1024)
-    spectrum = np.zeros(len(energy_bins))
-
-    # Background - exponential decrease + constant
-    background = 20 * np.exp(-energy_bins / 300) + 3
-    spectrum += np.random.poisson(background.clip(min=0))
-
-    if isotope == "Cs-137":
-        # Photopeak at 662 keV
-        photopeak = 500 * np.exp(-0.5 * ((energy_bins - 662) / 12) ** 2)
-        spectrum += np.random.poisson(photopeak.clip(min=0))
-
-        # Compton continuum below Compton edge at 477 keV
-        compton_cont = np.where(energy_bins < 477,
-                                60 * (1 + 0.3 * (energy_bins / 477)),
-                                np.where(energy_bins < 662,
-                                         10 * np.exp(-(energy_bins - 477) / 30), 0))
-        spectrum += np.random.poisson(compton_cont.clip(min=0))
-
-        # Backscatter peak at 184 keV
-        backscatter = 80 * np.exp(-0.5 * ((energy_bins - 184) / 20) ** 2)
-        spectrum += np.random.poisson(backscatter.clip(min=0))
-
-    elif isotope == "Co-60":
-        # Photopeak at 1173 keV
-        peak1 = 400 * np.exp(-0.5 * ((energy_bins - 1173) / 15) ** 2)
-        spectrum += np.random.poisson(peak1.clip(min=0))
-
-        # Photopeak at 1332 keV
-        peak2 = 350 * np.exp(-0.5 * ((energy_bins - 1332) / 16) ** 2)
-        spectrum += np.random.poisson(peak2.clip(min=0))
-
-        # Compton continua
-        compton1 = np.where(energy_bins < 963, 50 * (1 + 0.2 * energy_bins / 963), 0)
-        compton2 = np.where(energy_bins < 1118, 40 * (1 + 0.2 * energy_bins / 1118), 0)
-        spectrum += np.random.poisson(compton1.clip(min=0))
-        spectrum += np.random.poisson(compton2.clip(min=0))
-
-        # Backscatter peak
-        backscatter = 60 * np.exp(-0.5 * ((energy_bins - 214) / 25) ** 2)
-        spectrum += np.random.poisson(backscatter.clip(min=0))
-
-    elif isotope == "Eu-152":
-        # Eu-152 has many gamma lines - include the prominent ones
-        # 121.8 keV
-        peak1 = 350 * np.exp(-0.5 * ((energy_bins - 121.8) / 5) ** 2)
-        spectrum += np.random.poisson(peak1.clip(min=0))
-        # 244.7 keV
-        peak2 = 120 * np.exp(-0.5 * ((energy_bins - 244.7) / 7) ** 2)
-        spectrum += np.random.poisson(peak2.clip(min=0))
-        # 344.3 keV
-        peak3 = 320 * np.exp(-0.5 * ((energy_bins - 344.3) / 8) ** 2)
-        spectrum += np.random.poisson(peak3.clip(min=0))
-        # 411.1 keV
-        peak4 = 50 * np.exp(-0.5 * ((energy_bins - 411.1) / 9) ** 2)
-        spectrum += np.random.poisson(peak4.clip(min=0))
-        # 443.9 keV
-        peak5 = 60 * np.exp(-0.5 * ((energy_bins - 443.9) / 9) ** 2)
-        spectrum += np.random.poisson(peak5.clip(min=0))
-        # 778.9 keV
-        peak6 = 160 * np.exp(-0.5 * ((energy_bins - 778.9) / 12) ** 2)
-        spectrum += np.random.poisson(peak6.clip(min=0))
-        # 867.4 keV
-        peak7 = 55 * np.exp(-0.5 * ((energy_bins - 867.4) / 13) ** 2)
-        spectrum += np.random.poisson(peak7.clip(min=0))
-        # 964.1 keV
-        peak8 = 180 * np.exp(-0.5 * ((energy_bins - 964.1) / 14) ** 2)
-        spectrum += np.random.poisson(peak8.clip(min=0))
-        # 1085.8 keV
-        peak9 = 130 * np.exp(-0.5 * ((energy_bins - 1085.8) / 15) ** 2)
-        spectrum += np.random.poisson(peak9.clip(min=0))
-        # 1112.1 keV
-        peak10 = 170 * np.exp(-0.5 * ((energy_bins - 1112.1) / 15) ** 2)
-        spectrum += np.random.poisson(peak10.clip(min=0))
-        # 1408.0 keV
-        peak11 = 250 * np.exp(-0.5 * ((energy_bins - 1408.0) / 17) ** 2)
-        spectrum += np.random.poisson(peak11.clip(min=0))
-
-        # Compton continuum from multiple peaks
-        compton = np.where(energy_bins < 500, 40 * (1 + 0.3 * energy_bins / 500), 0)
-        compton += np.where(energy_bins < 900, 25 * (1 + 0.15 * energy_bins / 900), 0)
-        spectrum += np.random.poisson(compton.clip(min=0))
-
-    elif isotope == "Nat. Uranium":
-        # Natural uranium - dominated by U-238 decay chain (Pa-234m, Bi-214, Pb-214)
-        # and U-235 at 185.7 keV
-
-        # Th-234 / Pa-234m low energy lines
-        # 63.3 keV (Th-234)
-        peak1 = 200 * np.exp(-0.5 * ((energy_bins - 63.3) / 4) ** 2)
-        spectrum += np.random.poisson(peak1.clip(min=0))
-        # 92.4 keV (Th-234)
-        peak2 = 300 * np.exp(-0.5 * ((energy_bins - 92.4) / 4.5) ** 2)
-        spectrum += np.random.poisson(peak2.clip(min=0))
-        # 92.8 keV (Th-234) - overlaps
-        peak3 = 250 * np.exp(-0.5 * ((energy_bins - 92.8) / 4.5) ** 2)
-        spectrum += np.random.poisson(peak3.clip(min=0))
-
-        # U-235 at 185.7 keV
-        peak4 = 280 * np.exp(-0.5 * ((energy_bins - 185.7) / 6) ** 2)
-        spectrum += np.random.poisson(peak4.clip(min=0))
-
-        # Pb-214 lines
-        # 242 keV
-        peak5 = 80 * np.exp(-0.5 * ((energy_bins - 242) / 7) ** 2)
-        spectrum += np.random.poisson(peak5.clip(min=0))
-        # 295.2 keV
-        peak6 = 180 * np.exp(-0.5 * ((energy_bins - 295.2) / 8) ** 2)
-        spectrum += np.random.poisson(peak6.clip(min=0))
-        # 351.9 keV
-        peak7 = 340 * np.exp(-0.5 * ((energy_bins - 351.9) / 8) ** 2)
-        spectrum += np.random.poisson(peak7.clip(min=0))
-
-        # Bi-214 lines
-        # 609.3 keV
-        peak8 = 400 * np.exp(-0.5 * ((energy_bins - 609.3) / 11) ** 2)
-        spectrum += np.random.poisson(peak8.clip(min=0))
-        # 768.4 keV
-        peak9 = 60 * np.exp(-0.5 * ((energy_bins - 768.4) / 12) ** 2)
-        spectrum += np.random.poisson(peak9.clip(min=0))
-        # 1001.0 keV (Pa-234m)
-        peak10 = 120 * np.exp(-0.5 * ((energy_bins - 1001.0) / 14) ** 2)
-        spectrum += np.random.poisson(peak10.clip(min=0))
-        # 1120.3 keV
-        peak11 = 150 * np.exp(-0.5 * ((energy_bins - 1120.3) / 15) ** 2)
-        spectrum += np.random.poisson(peak11.clip(min=0))
-        # 1238.1 keV
-        peak12 = 70 * np.exp(-0.5 * ((energy_bins - 1238.1) / 16) ** 2)
-        spectrum += np.random.poisson(peak12.clip(min=0))
-        # 1764.5 keV
-        peak13 = 180 * np.exp(-0.5 * ((energy_bins - 1764.5) / 18) ** 2)
-        spectrum += np.random.poisson(peak13.clip(min=0))
-
-        # Enhanced low-energy continuum from beta and scatter
-        low_e = 80 * np.exp(-energy_bins / 150)
-        spectrum += np.random.poisson(low_e.clip(min=0))
-
-    # Plot and save
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.plot(energy_bins, spectrum, 'b-', linewidth=0.8)
-    ax.fill_between(energy_bins, spectrum, alpha=0.3, color='blue')
-    ax.set_xlabel('Energy (keV)', fontsize=14)
-    ax.set_ylabel('Counts', fontsize=14)
-    ax.set_title(f'Measured Spectrum: {isotope}', fontsize=16)
-    xlimits = {"Cs-137": 1000, "Co-60": 1600, "Eu-152": 1600, "Nat. Uranium": 2000}
-    ax.set_xlim(0, xlimits.get(isotope, 2000))
-    ax.set_ylim(0, None)
-    ax.grid(True, alpha=0.3)
-
-    # Add peak annotations
-    if isotope == "Cs-137":
-        peak_idx = np.argmin(np.abs(energy_bins - 662))
-        ax.annotate('662 keV', xy=(662, spectrum[peak_idx]),
-                    xytext=(780, spectrum[peak_idx] * 0.85),
-                    arrowprops=dict(arrowstyle='->', color='red'),
-                    fontsize=12, color='red')
-    elif isotope == "Co-60":
-        peak_idx1 = np.argmin(np.abs(energy_bins - 1173))
-        peak_idx2 = np.argmin(np.abs(energy_bins - 1332))
-        ax.annotate('1173 keV', xy=(1173, spectrum[peak_idx1]),
-                    xytext=(1020, spectrum[peak_idx1] * 1.15),
-                    arrowprops=dict(arrowstyle='->', color='red'),
-                    fontsize=12, color='red')
-        ax.annotate('1332 keV', xy=(1332, spectrum[peak_idx2]),
-                    xytext=(1450, spectrum[peak_idx2] * 1.15),
-                    arrowprops=dict(arrowstyle='->', color='red'),
-                    fontsize=12, color='red')
-    elif isotope == "Eu-152":
-        annotations = [(121.8, '122 keV'), (344.3, '344 keV'), (778.9, '779 keV'),
-                        (964.1, '964 keV'), (1112.1, '1112 keV'), (1408.0, '1408 keV')]
-        for energy, label in annotations:
-            idx = np.argmin(np.abs(energy_bins - energy))
-            ax.annotate(label, xy=(energy, spectrum[idx]),
-                        xytext=(energy + 40, spectrum[idx] * 1.1 + 15),
-                        arrowprops=dict(arrowstyle='->', color='red'),
-                        fontsize=9, color='red')
-    elif isotope == "Nat. Uranium":
-        annotations = [(92.4, '92 keV\n(Th-234)'), (185.7, '186 keV\n(U-235)'),
-                        (351.9, '352 keV\n(Pb-214)'), (609.3, '609 keV\n(Bi-214)'),
-                        (1001.0, '1001 keV\n(Pa-234m)'), (1764.5, '1765 keV\n(Bi-214)')]
-        for energy, label in annotations:
-            idx = np.argmin(np.abs(energy_bins - energy))
-            ax.annotate(label, xy=(energy, spectrum[idx]),
-                        xytext=(energy + 50, spectrum[idx] * 1.1 + 15),
-                        arrowprops=dict(arrowstyle='->', color='red'),
-                        fontsize=9, color='red')
-
-    plt.tight_layout()
-    plt.savefig(filepath, dpi=100)
-    plt.close()
-
-
-def generate_random_building(GRID_WIDTH, GRID_HEIGHT):
-    """Generate a randomized building layout with outer walls and random internal rooms."""
-    building_features = []
-    wall_set = set()
-    floors = []
-    margin = 5
-    inner_left = margin
-    inner_right = GRID_WIDTH - margin
-    inner_top = margin
-    inner_bottom = GRID_HEIGHT - margin
-
-    # Floors
-    for y in range(inner_top, inner_bottom):
-        for x in range(inner_left, inner_right):
-            floors.append((x, y))
-
-    def add_wall(x, y):
-        if (x, y) not in wall_set:
-            wall_set.add((x, y))
-            building_features.append((x, y))
-
-    # Front wall (top) - solid
-    for x in range(inner_left, inner_right + 1):
-        add_wall(x, inner_top)
-
-    # Back wall (bottom) - door in middle
-    door_center = GRID_WIDTH // 2
-    for x in range(inner_left, inner_right + 1):
-        if x != door_center and x != door_center + 1:
-            add_wall(x, inner_bottom)
-
-    # Left wall
-    for y in range(inner_top, inner_bottom + 1):
-        add_wall(inner_left, y)
-
-    # Right wall
-    for y in range(inner_top, inner_bottom + 1):
-        add_wall(inner_right, y)
-
-    # Random internal walls
-    num_h = random.randint(1, 2)
-    num_v = random.randint(1, 2)
-
-    # Pick horizontal wall y positions with minimum spacing
-    h_positions = []
-    for _ in range(50):
-        if len(h_positions) >= num_h:
-            break
-        y = random.randint(inner_top + 4, inner_bottom - 4)
-        if all(abs(y - hy) >= 5 for hy in h_positions):
-            h_positions.append(y)
-
-    # Pick vertical wall x positions with minimum spacing
-    v_positions = []
-    for _ in range(50):
-        if len(v_positions) >= num_v:
-            break
-        x = random.randint(inner_left + 4, inner_right - 4)
-        if all(abs(x - vx) >= 5 for vx in v_positions):
-            v_positions.append(x)
-
-    # Add horizontal walls with doorways
-    for wy in h_positions:
-        door_x = random.randint(inner_left + 2, inner_right - 3)
-        for x in range(inner_left + 1, inner_right):
-            if x != door_x and x != door_x + 1:
-                add_wall(x, wy)
-
-    # Add vertical walls with doorways in each horizontal segment
-    for wx in v_positions:
-        y_bounds = sorted([inner_top] + h_positions + [inner_bottom])
-        for i in range(len(y_bounds) - 1):
-            seg_start = y_bounds[i] + 1
-            seg_end = y_bounds[i + 1]
-            if seg_end - seg_start < 4:
-                continue
-            door_y = random.randint(seg_start + 1, seg_end - 3)
-            for y in range(seg_start, seg_end):
-                if y != door_y and y != door_y + 1:
-                    add_wall(wx, y)
-
-    return building_features, floors
-
-
-def main(screen):
+def main(screen, startup_profiler=None, startup_log=None, frame_timer=None, seed=None, player_name="Player"):
     pygame.display.set_caption("Radmapper V1.7 (now with spectral ID!)")
+    # Start-up phases are always timed, but only reported when a log path is given
+    if startup_profiler is None:
+        startup_profiler = StartupProfiler()
 
     SCREEN_HEIGHT = screen.get_height()
     SCREEN_WIDTH = screen.get_width()
@@ -579,28 +634,29 @@ def main(screen):
     CELL_SIZE = GRID_SIZE
 
     # Load textures
-    wall_image = pygame.image.load("textures/redbrick.png")
-    floor_image = pygame.image.load("textures/floor.jpg")
-    grass_image = pygame.image.load("textures/grass.png")
-    man_back_image = pygame.image.load("textures/man_back.png")
-    man_front_image = pygame.image.load("textures/man_front.png")
-    man_left_image = pygame.image.load("textures/man_left.png")
-    man_right_image = pygame.image.load("textures/man_right.png")
-    drone_image = pygame.image.load("textures/drone.png")
-    trefoil_image = pygame.image.load("textures/trefoil.png")
-
-    # Resize textures
-    # sprites here: https://opengameart.org/content/sci-fi-facility-asset-pack
-    wall_image = pygame.transform.scale(wall_image, (CELL_SIZE, CELL_SIZE))
-    floor_image = pygame.transform.scale(floor_image, (CELL_SIZE, CELL_SIZE))
-    grass_image = pygame.transform.scale(grass_image, (CELL_SIZE, CELL_SIZE))
-    man_front_image = pygame.transform.scale(man_front_image, (CELL_SIZE * 2, CELL_SIZE * 2))
-    man_back_image = pygame.transform.scale(man_back_image, (CELL_SIZE * 2, CELL_SIZE * 2))
-    man_left_image = pygame.transform.scale(man_left_image, (CELL_SIZE * 2, CELL_SIZE * 2))
-    man_right_image = pygame.transform.scale(man_right_image, (CELL_SIZE * 2, CELL_SIZE * 2))
-    drone_image = pygame.transform.scale(drone_image, (CELL_SIZE * 3, CELL_SIZE * 3))
-    trefoil_image = pygame.transform.scale(trefoil_image, (CELL_SIZE * 5, CELL_SIZE * 5))
-    source_image = pygame.transform.scale(trefoil_image, (CELL_SIZE, CELL_SIZE))
+    with startup_profiler.phase("textures"):
+        wall_image = pygame.image.load("textures/redbrick.png")
+        floor_image = pygame.image.load("textures/floor.jpg")
+        grass_image = pygame.image.load("textures/grass.png")
+        man_back_image = pygame.image.load("textures/man_back.png")
+        man_front_image = pygame.image.load("textures/man_front.png")
+        man_left_image = pygame.image.load("textures/man_left.png")
+        man_right_image = pygame.image.load("textures/man_right.png")
+        drone_image = pygame.image.load("textures/drone.png")
+        trefoil_image = pygame.image.load("textures/trefoil.png")
+
+        # Resize textures
+        # sprites here: https://opengameart.org/content/sci-fi-facility-asset-pack
+        wall_image = pygame.transform.scale(wall_image, (CELL_SIZE, CELL_SIZE))
+        floor_image = pygame.transform.scale(floor_image, (CELL_SIZE, CELL_SIZE))
+        grass_image = pygame.transform.scale(grass_image, (CELL_SIZE, CELL_SIZE))
+        man_front_image = pygame.transform.scale(man_front_image, (CELL_SIZE * 2, CELL_SIZE * 2))
+        man_back_image = pygame.transform.scale(man_back_image, (CELL_SIZE * 2, CELL_SIZE * 2))
+        man_left_image = pygame.transform.scale(man_left_image, (CELL_SIZE * 2, CELL_SIZE * 2))
+        man_right_image = pygame.transform.scale(man_right_image, (CELL_SIZE * 2, CELL_SIZE * 2))
+        drone_image = pygame.transform.scale(drone_image, (CELL_SIZE * 3, CELL_SIZE * 3))
+        trefoil_image = pygame.transform.scale(trefoil_image, (CELL_SIZE * 5, CELL_SIZE * 5))
+        source_image = pygame.transform.scale(trefoil_image, (CELL_SIZE, CELL_SIZE))
 
     # Game states
     MENU, GROUND_MAPPING, AERIAL_MAPPING, TEACHING_MODE, GAME_OVER, SHOW_SOURCE, CALL_MAIN, SHOW_MAPS, QUIT, SPECTRUM_MODE, SETTINGS = 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10
@@ -612,6 +668,7 @@ def main(screen):
         'ground_time': 35,
         'aerial_time': 20,
         'max_sources': 3,
+        'spectrum_sources': 5,
     }
     GROUND_MAPPING_TIME = settings['ground_time']
     AERIAL_MAPPING_TIME = settings['aerial_time']
@@ -639,15 +696,28 @@ def main(screen):
     clock = pygame.time.Clock()
     car_x, car_y = GRID_WIDTH // 2, GRID_HEIGHT - 2
 
-    # Initialize count data for the heat map
-    count_data = np.zeros((GRID_HEIGHT, GRID_WIDTH))
+    # Every reading of the current mapping level, for the heat map
+    measurements = None
+    # Fills in the unvisited tiles of the final heatmap, and of the minimap when P is on
+    interpolator = None
+    show_predicted = False
+    # Time at which the predicted minimap layer is next re-interpolated
+    predicted_refresh = 0
 
     heatmap_image = None
     heatmap_source_image = None
     last_heatmap_data = {}
 
+    # All randomness in the session comes from this Generator, so a run is reproduced
+    # exactly by its seed. Each mapping level gets its own seed drawn from it.
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    rng = np.random.default_rng(seed)
+    level_seed = None
+    level_rng = None
+
     # Generate building layout
-    building_features_list, floors = generate_random_building(GRID_WIDTH, GRID_HEIGHT)
+    building_features_list, floors, wall_materials = generate_random_building(GRID_WIDTH, GRID_HEIGHT, rng)
     building_features = set(building_features_list)
 
     simple_walls = []
@@ -668,33 +738,63 @@ def main(screen):
         simple_walls.append((i, front_wall_y))
     simple_walls_set = set(simple_walls)
 
+    # Pre-rendered static layers; level_background is baked when a mapping level is generated
+    with startup_profiler.phase("static layers"):
+        grass_background = build_level_background(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, grass_image)
+        teaching_background = build_level_background(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, grass_image,
+                                                     wall_image=wall_image, walls=simple_walls)
+    level_background = None
+    minimap = None
+
     # Randomly place the source in the grid
-    source_x, source_y = random.randint(1, GRID_WIDTH - 1), random.randint(1, GRID_HEIGHT - 1)
+    source_x, source_y = int(rng.integers(1, GRID_WIDTH)), int(rng.integers(1, GRID_HEIGHT))
     # If the source is in a wall, place it again until it isn't
     while (source_x, source_y) in building_features:
-        source_x, source_y = random.randint(1, GRID_WIDTH - 1), random.randint(1, GRID_HEIGHT - 1)
+        source_x, source_y = int(rng.integers(1, GRID_WIDTH)), int(rng.integers(1, GRID_HEIGHT))
 
     game_over = False
     prev_state = 10
     a = 0
     prev_pos = (0, 0)
 
+    # Spectra accumulate in the game loop and are rendered off it, one frame at a time
+    spectrum_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spectrum")
+
     # Spectrum mode variables
     spectrum_sources = []
+    # Buckets spectrum_sources by position for the proximity checks
+    spectrum_index = SpatialIndex()
     showing_spectrum = False
     spectrum_surface = None
+    spectrum_future = None
+    spectrum_acquisition = None
+    spectrum_rate = 0
+    spectrum_export_path = None
+    spectrum_source_index = None
     measured_sources = set()
+    # Player's isotope guess for each measured source
+    source_guesses = {}
+    isotope_choices = list(ISOTOPES)
 
     # Teaching mode variables
     teaching_instructions_shown = False
     showing_instructions = False
     teaching_spectrum_surface = None
+    teaching_spectrum_future = None
+    teaching_acquisition = None
+    teaching_spectrum_rate = 0
+    teaching_export_path = None
     showing_teaching_spectrum = False
     teaching_source_isotope = "Cs-137"
     teaching_measured = False
+    teaching_los = None
 
-    # Mapping mode sources (list of (x, y) tuples)
+    # Mapping mode sources (list of (x, y) tuples) and their expected CPS field
     mapping_sources = []
+    # Tick log of the current mapping level, saved when its time runs out
+    session_recorder = None
+    rate_field = None
+    level_transmission = None
 
     # Mapping mode instructions
     showing_mapping_instructions = False
@@ -705,41 +805,65 @@ def main(screen):
 
     # Settings menu selection
     settings_selected = 0  # which setting is currently selected
-    settings_keys = ['ground_time', 'aerial_time', 'max_sources']
-    settings_labels = ['Ground Time (s)', 'Aerial Time (s)', 'Max Sources']
-    settings_ranges = {'ground_time': (10, 120), 'aerial_time': (10, 120), 'max_sources': (1, 5)}
+    settings_keys = ['ground_time', 'aerial_time', 'max_sources', 'spectrum_sources']
+    settings_labels = ['Ground Time (s)', 'Aerial Time (s)', 'Max Sources', 'Spectrum ID Sources']
+    settings_ranges = {'ground_time': (10, 120), 'aerial_time': (10, 120), 'max_sources': (1, 5),
+                       'spectrum_sources': (5, 200)}
 
     # Mapping HUD tracking
     visited_tiles = set()
     peak_cps = 0
     total_floor_tiles = len(floors)
 
+    # Per-frame section timings; F3 shows them
+    if frame_timer is None:
+        frame_timer = FrameTimer()
+    show_frame_stats = False
+    frame_stats_panel = None
+    frame_stats_refresh = 0
+
+    if startup_log is not None:
+        startup_profiler.write_report(startup_log)
+
     while not game_over:
+        frame_timer.start_frame()
         keys = pygame.key.get_pressed()
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_frame_stats = not show_frame_stats
             if event.type == pygame.VIDEORESIZE:
                 # There's some code to add back window content here.
                 screen = pygame.display.set_mode((event.w, event.h),
                                                  pygame.RESIZABLE)
 
                 if current_state != GROUND_MAPPING and current_state != AERIAL_MAPPING:
-                    main(screen)
+                    main(screen, frame_timer=frame_timer, seed=int(rng.integers(2 ** 63)), player_name=player_name)
                 else:
                     SCREEN_HEIGHT = screen.get_height()
                     SCREEN_WIDTH = screen.get_width()
                     GRID_SIZE = 30
                     GRID_WIDTH, GRID_HEIGHT = SCREEN_WIDTH // GRID_SIZE, SCREEN_HEIGHT // GRID_SIZE
 
-                    # re-initialize count data for the heat map with new size
-                    previous_count_data = count_data.copy()
-                    count_data = np.zeros((GRID_HEIGHT, GRID_WIDTH))
-                    for i in range(min(previous_count_data.shape[0], count_data.shape[0])):
-                        for j in range(min(previous_count_data.shape[1], count_data.shape[1])):
-                            count_data[i][j] = previous_count_data[i][j]
+                    # Readings outside the new grid are kept but drop out of the views
+                    session_recorder.resize(GRID_WIDTH, GRID_HEIGHT)
+
+                    level_transmission = build_transmission_cache(wall_materials, GRID_WIDTH, GRID_HEIGHT)
+                    level_background = build_level_background(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, grass_image,
+                                                              floor_image, floors, wall_image, building_features)
+                    grass_background = build_level_background(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, grass_image)
+                    minimap = Minimap(220, GRID_WIDTH, GRID_HEIGHT, floors, building_features, minimap.max_cps)
+                    interpolator = FieldInterpolator(GRID_WIDTH, GRID_HEIGHT,
+                                                     () if current_state == AERIAL_MAPPING else building_features)
+                    if show_predicted:
+                        minimap.paint_field(*interpolator.interpolate(measurements.tile_stats()))
+                    else:
+                        minimap.paint_field(measurements.last(), measurements.sample_count() > 0)
+                    rate_field = compute_count_rate_field(GRID_WIDTH, GRID_HEIGHT, mapping_sources, level_transmission,
+                                                          is_aerial=(current_state == AERIAL_MAPPING))
 
                     if car_y >= GRID_HEIGHT:
                         car_y = GRID_HEIGHT - 1
@@ -785,27 +909,40 @@ def main(screen):
                         if button.rect.collidepoint(event.pos):
                             current_state = button.action
             if current_state == SPECTRUM_MODE:
+                if event.type == pygame.KEYDOWN and showing_spectrum and \
+                        pygame.K_1 <= event.key < pygame.K_1 + len(isotope_choices):
+                    # Guess the isotope of the source being measured; one guess per source
+                    if spectrum_source_index not in source_guesses:
+                        source_guesses[spectrum_source_index] = isotope_choices[event.key - pygame.K_1]
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                     if showing_spectrum_instructions:
                         showing_spectrum_instructions = False
                     elif showing_spectrum:
                         showing_spectrum = False
+                        spectrum_future = None
+                        finish_spectrum_acquisition(spectrum_acquisition, spectrum_export_path)
+                        spectrum_acquisition = None
                     else:
-                        for i, (sx, sy, isotope) in enumerate(spectrum_sources):
-                            if abs(car_x - sx) <= 1 and abs(car_y - sy) <= 1:
-                                filepath = f'plots/spectrum_{isotope.replace("-", "")}_{i}.png'
-                                generate_and_save_spectrum(isotope, filepath)
-                                spectrum_surface = pygame.image.load(filepath)
-                                spectrum_surface = pygame.transform.scale(spectrum_surface,
-                                    (int(SCREEN_WIDTH * 0.7), int(SCREEN_HEIGHT * 0.7)))
-                                showing_spectrum = True
-                                measured_sources.add(i)
-                                break
+                        i = spectrum_index.nearest_item_within(car_x, car_y, 1)
+                        if i is not None:
+                            sx, sy, isotope = spectrum_sources[i]
+                            spectrum_export_path = None
+                            if EXPORT_SPECTRUM_PNGS:
+                                spectrum_export_path = f'plots/spectrum_{isotope.replace("-", "")}_{i}.png'
+                            spectrum_surface = None
+                            spectrum_acquisition = SpectrumAccumulator(isotope, rng=rng)
+                            spectrum_rate = detector_count_rate(car_x, car_y, sx, sy)
+                            spectrum_source_index = i
+                            showing_spectrum = True
+                            measured_sources.add(i)
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     if showing_spectrum_instructions:
                         showing_spectrum_instructions = False
                     elif showing_spectrum:
                         showing_spectrum = False
+                        spectrum_future = None
+                        finish_spectrum_acquisition(spectrum_acquisition, spectrum_export_path)
+                        spectrum_acquisition = None
                     else:
                         for button in in_game_buttons:
                             if button.rect.collidepoint(event.pos):
@@ -816,13 +953,18 @@ def main(screen):
                         showing_instructions = False
                     elif showing_teaching_spectrum:
                         showing_teaching_spectrum = False
+                        teaching_spectrum_future = None
+                        finish_spectrum_acquisition(teaching_acquisition, teaching_export_path)
+                        teaching_acquisition = None
                     else:
                         if abs(car_x - source_x) <= 1 and abs(car_y - source_y) <= 1:
-                            filepath = f'plots/spectrum_teaching_{teaching_source_isotope.replace("-", "").replace(" ", "").replace(".", "")}.png'
-                            generate_and_save_spectrum(teaching_source_isotope, filepath)
-                            teaching_spectrum_surface = pygame.image.load(filepath)
-                            teaching_spectrum_surface = pygame.transform.scale(teaching_spectrum_surface,
-                                (int(SCREEN_WIDTH * 0.7), int(SCREEN_HEIGHT * 0.7)))
+                            teaching_export_path = None
+                            if EXPORT_SPECTRUM_PNGS:
+                                teaching_export_path = f'plots/spectrum_teaching_{teaching_source_isotope.replace("-", "").replace(" ", "").replace(".", "")}.png'
+                            teaching_spectrum_surface = None
+                            teaching_acquisition = SpectrumAccumulator(teaching_source_isotope, rng=rng)
+                            teaching_spectrum_rate = detector_count_rate(
+                                car_x, car_y, source_x, source_y, shielded=not teaching_los[car_y, car_x])
                             showing_teaching_spectrum = True
                             teaching_measured = True
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -830,6 +972,9 @@ def main(screen):
                         showing_instructions = False
                     elif showing_teaching_spectrum:
                         showing_teaching_spectrum = False
+                        teaching_spectrum_future = None
+                        finish_spectrum_acquisition(teaching_acquisition, teaching_export_path)
+                        teaching_acquisition = None
                     else:
                         for button in in_game_buttons:
                             if button.rect.collidepoint(event.pos):
@@ -841,13 +986,20 @@ def main(screen):
                         showing_mapping_instructions = False
                         start_time = pygame.time.get_ticks()
                 else:
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                        show_predicted = not show_predicted
+                        if show_predicted:
+                            minimap.paint_field(*interpolator.interpolate(measurements.tile_stats()))
+                            predicted_refresh = pygame.time.get_ticks() + 1000
+                        else:
+                            minimap.paint_field(measurements.last(), measurements.sample_count() > 0)
                     if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                         for button in in_game_buttons:
                             if button.rect.collidepoint(event.pos):
                                 current_state = button.action
 
             if current_state == MENU:
-                draw_grass(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, screen, grass_image)
+                screen.blit(grass_background, (0, 0))
                 for button in menu_buttons:
                     # Check if the mouse pointer is over the button
                     if button.rect.collidepoint(pygame.mouse.get_pos()):
@@ -863,7 +1015,7 @@ def main(screen):
                 draw_menu(FONT_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, screen, trefoil_image)
 
             if current_state == SETTINGS:
-                draw_grass(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, screen, grass_image)
+                screen.blit(grass_background, (0, 0))
 
                 # Darken background
                 overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -871,11 +1023,11 @@ def main(screen):
                 overlay.set_alpha(180)
                 screen.blit(overlay, (0, 0))
 
-                font_title = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 32)
-                font_item = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 22)
-                font_hint = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 16)
+                font_title = get_font(32)
+                font_item = get_font(22)
+                font_hint = get_font(16)
 
-                title = font_title.render("Settings", True, (255, 105, 180))
+                title = render_text(font_title, "Settings", True, (255, 105, 180))
                 screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, SCREEN_HEIGHT // 6))
 
                 y_start = SCREEN_HEIGHT // 6 + title.get_height() + 40
@@ -888,7 +1040,7 @@ def main(screen):
                     arrow_l = "< " if is_sel else "  "
                     arrow_r = " >" if is_sel else "  "
                     line_text = f"{arrow_l}{label}: {val}{arrow_r}"
-                    rendered = font_item.render(line_text, True, color)
+                    rendered = render_dynamic_text(font_item, line_text, True, color)
                     screen.blit(rendered, (SCREEN_WIDTH // 2 - rendered.get_width() // 2, y_start + i * 50))
 
                     # Draw a bar showing the value range
@@ -902,8 +1054,8 @@ def main(screen):
                     pygame.draw.rect(screen, fill_color, (bar_x, bar_y, int(bar_w * fill_frac), bar_h))
 
                 # Hints
-                hint1 = font_hint.render("UP/DOWN to select, LEFT/RIGHT to change", True, (160, 160, 160))
-                hint2 = font_hint.render("ENTER or ESC to return to menu", True, (160, 160, 160))
+                hint1 = render_text(font_hint, "UP/DOWN to select, LEFT/RIGHT to change", True, (160, 160, 160))
+                hint2 = render_text(font_hint, "ENTER or ESC to return to menu", True, (160, 160, 160))
                 screen.blit(hint1, (SCREEN_WIDTH // 2 - hint1.get_width() // 2, y_start + len(settings_keys) * 50 + 30))
                 screen.blit(hint2, (SCREEN_WIDTH // 2 - hint2.get_width() // 2, y_start + len(settings_keys) * 50 + 55))
 
@@ -914,7 +1066,7 @@ def main(screen):
                     pygame.draw.rect(screen, (255, 0, 0), back_btn_rect)
                 else:
                     pygame.draw.rect(screen, (150, 150, 150), back_btn_rect)
-                back_label = font_item.render("Back", True, FONT_COLOR)
+                back_label = render_text(font_item, "Back", True, FONT_COLOR)
                 screen.blit(back_label, (back_btn_rect.centerx - back_label.get_width() // 2,
                                          back_btn_rect.centery - back_label.get_height() // 2))
 
@@ -925,6 +1077,7 @@ def main(screen):
             current_volume = decrease_volume(current_volume)
         if keys[pygame.K_RIGHTBRACKET]:
             current_volume = increase_volume(current_volume)
+        frame_timer.mark("events")
 
         if current_state == MENU:
             if prev_state != current_state and (prev_state != SHOW_MAPS or prev_state != SHOW_SOURCE):
@@ -938,8 +1091,10 @@ def main(screen):
         if current_state == TEACHING_MODE:
             if prev_state != current_state:
                 source_x, source_y = GRID_WIDTH // 2, GRID_HEIGHT // 2
+                teaching_los = visibility_mask(wall_grid(simple_walls_set, GRID_WIDTH, GRID_HEIGHT),
+                                               source_x, source_y)
                 starting_time = 10000
-                teaching_source_isotope = random.choice(["Cs-137", "Co-60", "Eu-152", "Nat. Uranium"])
+                teaching_source_isotope = isotope_choices[rng.integers(len(isotope_choices))]
                 teaching_measured = False
                 showing_teaching_spectrum = False
                 teaching_spectrum_surface = None
@@ -954,20 +1109,24 @@ def main(screen):
 
         if current_state == GROUND_MAPPING:
             if prev_state != current_state:
-                building_features_list, floors = generate_random_building(GRID_WIDTH, GRID_HEIGHT)
+                level_seed = int(rng.integers(2 ** 63))
+                level_rng = np.random.default_rng(level_seed)
+                building_features_list, floors, wall_materials, mapping_sources = generate_level(
+                    GRID_WIDTH, GRID_HEIGHT, settings['max_sources'], level_rng)
                 building_features = set(building_features_list)
+                session_recorder = SessionRecorder(seed, level_seed, "ground", GRID_WIDTH, GRID_HEIGHT,
+                                                   settings['max_sources'])
+                measurements = session_recorder.measurements
+                interpolator = FieldInterpolator(GRID_WIDTH, GRID_HEIGHT, building_features)
                 total_floor_tiles = len(floors)
-                count_data = np.zeros((GRID_HEIGHT, GRID_WIDTH))
                 heatmap_image = None
                 car_x, car_y = GRID_WIDTH // 2, GRID_HEIGHT - 2
-                # Place 1-N random sources
-                num_sources = random.randint(1, settings['max_sources'])
-                mapping_sources = []
-                for _ in range(num_sources):
-                    sx, sy = random.randint(6, GRID_WIDTH - 6), random.randint(6, GRID_HEIGHT - 6)
-                    while (sx, sy) in building_features or any(abs(sx - ex) < 4 and abs(sy - ey) < 4 for ex, ey in mapping_sources):
-                        sx, sy = random.randint(6, GRID_WIDTH - 6), random.randint(6, GRID_HEIGHT - 6)
-                    mapping_sources.append((sx, sy))
+                level_transmission = build_transmission_cache(wall_materials, GRID_WIDTH, GRID_HEIGHT)
+                level_background = build_level_background(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, grass_image,
+                                                          floor_image, floors, wall_image, building_features)
+                # Minimap heat scale differs for ground vs aerial (matches heatmap plot ranges)
+                minimap = Minimap(220, GRID_WIDTH, GRID_HEIGHT, floors, building_features, 500)
+                rate_field = compute_count_rate_field(GRID_WIDTH, GRID_HEIGHT, mapping_sources, level_transmission)
                 starting_time = settings['ground_time']
                 showing_mapping_instructions = True
                 visited_tiles = set()
@@ -983,20 +1142,25 @@ def main(screen):
 
         if current_state == AERIAL_MAPPING:
             if prev_state != current_state:
-                building_features_list, floors = generate_random_building(GRID_WIDTH, GRID_HEIGHT)
+                level_seed = int(rng.integers(2 ** 63))
+                level_rng = np.random.default_rng(level_seed)
+                building_features_list, floors, wall_materials, mapping_sources = generate_level(
+                    GRID_WIDTH, GRID_HEIGHT, settings['max_sources'], level_rng)
                 building_features = set(building_features_list)
+                session_recorder = SessionRecorder(seed, level_seed, "aerial", GRID_WIDTH, GRID_HEIGHT,
+                                                   settings['max_sources'])
+                measurements = session_recorder.measurements
+                interpolator = FieldInterpolator(GRID_WIDTH, GRID_HEIGHT, ())
                 total_floor_tiles = len(floors)
-                count_data = np.zeros((GRID_HEIGHT, GRID_WIDTH))
                 heatmap_image = None
                 car_x, car_y = GRID_WIDTH // 2, GRID_HEIGHT - 2
-                # Place 1-N random sources
-                num_sources = random.randint(1, settings['max_sources'])
-                mapping_sources = []
-                for _ in range(num_sources):
-                    sx, sy = random.randint(6, GRID_WIDTH - 6), random.randint(6, GRID_HEIGHT - 6)
-                    while (sx, sy) in building_features or any(abs(sx - ex) < 4 and abs(sy - ey) < 4 for ex, ey in mapping_sources):
-                        sx, sy = random.randint(6, GRID_WIDTH - 6), random.randint(6, GRID_HEIGHT - 6)
-                    mapping_sources.append((sx, sy))
+                level_transmission = build_transmission_cache(wall_materials, GRID_WIDTH, GRID_HEIGHT)
+                level_background = build_level_background(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, grass_image,
+                                                          floor_image, floors, wall_image, building_features)
+                # Minimap heat scale differs for ground vs aerial (matches heatmap plot ranges)
+                minimap = Minimap(220, GRID_WIDTH, GRID_HEIGHT, floors, building_features, 50)
+                rate_field = compute_count_rate_field(GRID_WIDTH, GRID_HEIGHT, mapping_sources, level_transmission,
+                                                      is_aerial=True)
                 showing_mapping_instructions = True
                 visited_tiles = set()
                 peak_cps = 0
@@ -1021,30 +1185,28 @@ def main(screen):
                 showing_spectrum_instructions = True
                 spectrum_surface = None
                 measured_sources = set()
+                source_guesses = {}
                 # Place sources randomly with spacing
                 spectrum_sources = []
-                all_isotopes = ["Cs-137", "Co-60", "Eu-152", "Nat. Uranium"]
-                isotopes = random.choices(all_isotopes, k=5)
+                spectrum_index = SpatialIndex()
+                num_spectrum_sources = settings['spectrum_sources']
+                isotopes = [isotope_choices[i] for i in rng.integers(len(isotope_choices), size=num_spectrum_sources)]
                 # Ensure at least 3 different isotopes appear
                 while len(set(isotopes)) < 3:
-                    isotopes = random.choices(all_isotopes, k=5)
-                random.shuffle(isotopes)
+                    isotopes = [isotope_choices[i] for i in rng.integers(len(isotope_choices), size=num_spectrum_sources)]
+                rng.shuffle(isotopes)
                 for iso in isotopes:
-                    placed = False
-                    for _ in range(100):
-                        sx = random.randint(4, GRID_WIDTH - 4)
-                        sy = random.randint(4, GRID_HEIGHT - 4)
-                        too_close = False
-                        for (ex, ey, _ei) in spectrum_sources:
-                            if abs(sx - ex) < 5 and abs(sy - ey) < 5:
-                                too_close = True
-                                break
-                        if not too_close:
-                            spectrum_sources.append((sx, sy, iso))
-                            placed = True
+                    # Sources are kept 5 tiles apart while there is room, then 3, the least
+                    # spacing at which no tile is next to two sources
+                    for attempt in range(200):
+                        sx = int(rng.integers(4, GRID_WIDTH - 3))
+                        sy = int(rng.integers(4, GRID_HEIGHT - 3))
+                        if not spectrum_index.too_close(sx, sy, 5 if attempt < 100 else 3):
                             break
-                    if not placed:
-                        spectrum_sources.append((sx, sy, iso))
+                    spectrum_index.insert(sx, sy, len(spectrum_sources))
+                    spectrum_sources.append((sx, sy, iso))
+
+        frame_timer.mark("state")
 
         if current_state == GROUND_MAPPING or current_state == AERIAL_MAPPING or current_state == TEACHING_MODE:
             can_move = True
@@ -1089,73 +1251,66 @@ def main(screen):
             time_left = max(0, starting_time * 1000 - (current_time - start_time))
 
             # Update count data for the heat map and timer
-            if current_state == GROUND_MAPPING:
-                bg = np.random.poisson(7)
-                total_signal = 0
-                for (msx, msy) in mapping_sources:
-                    los = has_line_of_sight(car_x, car_y, msx, msy, building_features)
-                    d2 = distance_squared(car_x, car_y, msx, msy)
-                    if not los:
-                        total_signal += np.random.poisson(5000 / d2)
-                    else:
-                        total_signal += np.random.poisson(10000 / d2)
-                count_data[car_y, car_x] = min(10000, bg + total_signal)
+            if current_state == GROUND_MAPPING or current_state == AERIAL_MAPPING:
+                reading = min(10000, level_rng.poisson(rate_field[car_y, car_x]))
+                # Readings only count once the instructions are closed and the clock runs
+                if not showing_mapping_instructions:
+                    session_recorder.append(current_time - start_time, car_x, car_y, reading)
             elif current_state == TEACHING_MODE:
-                bg = np.random.poisson(7)
-                line_of_sight = has_line_of_sight(car_x, car_y, source_x, source_y, simple_walls_set)
-                if not line_of_sight:
-                    count_data[car_y, car_x] = min(5000, bg + np.random.poisson(
+                bg = rng.poisson(7)
+                if not teaching_los[car_y, car_x]:
+                    reading = min(5000, bg + rng.poisson(
                         5000 / distance_squared(car_x, car_y, source_x, source_y)))
                 else:
-                    count_data[car_y, car_x] = min(10000, bg + np.random.poisson(
+                    reading = min(10000, bg + rng.poisson(
                         10000 / distance_squared(car_x, car_y, source_x, source_y)))
-            elif current_state == AERIAL_MAPPING:
-                bg = np.random.poisson(7 / 3)
-                total_signal = 0
-                for (msx, msy) in mapping_sources:
-                    total_signal += np.random.poisson(10000 / distance_squared_3D(car_x, car_y, msx, msy))
-                count_data[car_y, car_x] = min(10000, bg + total_signal)
 
             # Track visited tiles and peak CPS for mapping modes
-            if current_state == GROUND_MAPPING or current_state == AERIAL_MAPPING:
+            if (current_state == GROUND_MAPPING or current_state == AERIAL_MAPPING) and \
+                    not showing_mapping_instructions:
                 visited_tiles.add((car_x, car_y))
-                current_cps = count_data[car_y, car_x]
+                current_cps = reading
+                # The predicted layer is refreshed once a second, whatever the frame rate;
+                # the tile just measured is painted on top of it every tick
+                if show_predicted and current_time >= predicted_refresh:
+                    minimap.paint_field(*interpolator.interpolate(measurements.tile_stats()))
+                    predicted_refresh = current_time + 1000
+                minimap.update_tile(car_x, car_y, current_cps)
                 if current_cps > peak_cps:
                     peak_cps = current_cps
 
+            frame_timer.mark("update")
+
             # Draw everything on the screen
-            draw_grass(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, screen, grass_image)
             if current_state == GROUND_MAPPING or current_state == AERIAL_MAPPING:
-                draw_floor(floors, screen, floor_image, CELL_SIZE)
-                for wall in building_features:
-                    draw_wall(wall[0], wall[1], wall_image, GRID_SIZE, screen)
+                screen.blit(level_background, (0, 0))
             if current_state == TEACHING_MODE:
+                screen.blit(teaching_background, (0, 0))
                 draw_source(source_x, source_y, CELL_SIZE, source_image, screen)
                 if teaching_measured:
                     pygame.draw.rect(screen, (0, 255, 0),
                         (source_x * CELL_SIZE - 2, source_y * CELL_SIZE - 2,
                          CELL_SIZE + 4, CELL_SIZE + 4), 3)
-                for wall in simple_walls:
-                    draw_wall(wall[0], wall[1], wall_image, GRID_SIZE, screen)
             draw_car(car_x, car_y, car_image, CELL_SIZE, screen)
 
             if prev_pos != (car_x, car_y):
-                counts = count_data[car_y, car_x]
+                counts = reading
 
             draw_counts(counts, car_x * GRID_SIZE, car_y * GRID_SIZE, screen)
 
             prev_pos = (car_x, car_y)
+            frame_timer.mark("world")
 
             # Draw minimap and stats HUD for mapping modes
             if (current_state == GROUND_MAPPING or current_state == AERIAL_MAPPING) and not showing_mapping_instructions:
                 # Coverage, peak CPS, and battery HUD
-                font_hud = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 20)
+                font_hud = get_font(20)
                 battery_pct = 100 * (time_left / 1000) / starting_time
                 coverage_pct = 100 * len(visited_tiles) / max(1, total_floor_tiles)
                 bat_color = (0, 200, 255) if battery_pct > 25 else (255, 80, 80)
-                bat_text = font_hud.render(f"Battery: {battery_pct:.0f}%", True, bat_color)
-                cov_text = font_hud.render(f"Coverage: {coverage_pct:.0f}%", True, (0, 255, 0))
-                peak_text = font_hud.render(f"Peak CPS: {peak_cps:.0f}", True, (255, 200, 0))
+                bat_text = render_dynamic_text(font_hud, f"Battery: {battery_pct:.0f}%", True, bat_color)
+                cov_text = render_dynamic_text(font_hud, f"Coverage: {coverage_pct:.0f}%", True, (0, 255, 0))
+                peak_text = render_dynamic_text(font_hud, f"Peak CPS: {peak_cps:.0f}", True, (255, 200, 0))
 
                 # Background panel for stats
                 panel_w = max(bat_text.get_width(), cov_text.get_width(), peak_text.get_width()) + 20
@@ -1172,57 +1327,17 @@ def main(screen):
                 screen.blit(peak_text, (panel_x + 8, panel_y + 2 * line_h + 12))
 
                 # Live minimap in bottom-left
-                minimap_w = 220
-                minimap_h = int(minimap_w * GRID_HEIGHT / GRID_WIDTH)
-                minimap_surface = pygame.Surface((minimap_w, minimap_h))
-                minimap_surface.fill((30, 30, 30))
-
-                scale_x = minimap_w / GRID_WIDTH
-                scale_y = minimap_h / GRID_HEIGHT
-
-                # Draw floor area
-                for (fx, fy) in floors:
-                    mx = int(fx * scale_x)
-                    my = int(fy * scale_y)
-                    pygame.draw.rect(minimap_surface, (60, 60, 60),
-                        (mx, my, max(1, int(scale_x)), max(1, int(scale_y))))
-
-                # Draw visited tiles with heat color
-                # Scale differently for ground vs aerial (matches heatmap plot ranges)
-                minimap_max = 50 if current_state == AERIAL_MAPPING else 500
-                for (vx, vy) in visited_tiles:
-                    cv = count_data[vy, vx]
-                    intensity = min(1.0, cv / minimap_max)
-                    r_val = int(255 * intensity)
-                    b_val = int(255 * (1 - intensity))
-                    mx = int(vx * scale_x)
-                    my = int(vy * scale_y)
-                    pygame.draw.rect(minimap_surface, (r_val, 50, b_val),
-                        (mx, my, max(1, int(scale_x)), max(1, int(scale_y))))
-
-                # Draw walls on minimap
-                for (wx, wy) in building_features:
-                    mx = int(wx * scale_x)
-                    my = int(wy * scale_y)
-                    pygame.draw.rect(minimap_surface, (180, 180, 180),
-                        (mx, my, max(1, int(scale_x)), max(1, int(scale_y))))
-
-                # Draw player position
-                px = int(car_x * scale_x)
-                py = int(car_y * scale_y)
-                pygame.draw.circle(minimap_surface, (0, 255, 0), (px, py), 3)
-
-                # Border and blit
                 minimap_x = 8
-                minimap_y = SCREEN_HEIGHT - minimap_h - 40
-                border_rect = pygame.Rect(minimap_x - 2, minimap_y - 2, minimap_w + 4, minimap_h + 4)
-                pygame.draw.rect(screen, (255, 255, 255), border_rect, 2)
-                screen.blit(minimap_surface, (minimap_x, minimap_y))
+                minimap_y = SCREEN_HEIGHT - minimap.height - 40
+                minimap.draw(screen, minimap_x, minimap_y, car_x, car_y)
 
                 # Minimap label
-                map_label = font_hud.render("Minimap", True, (255, 255, 255))
+                map_label = render_text(font_hud, "Minimap (predicted)" if show_predicted else "Minimap",
+                                        True, (255, 255, 255))
                 screen.blit(map_label, (minimap_x, minimap_y - map_label.get_height() - 2))
 
+            frame_timer.mark("hud")
+
             # Mapping mode instructions overlay
             if (current_state == GROUND_MAPPING or current_state == AERIAL_MAPPING) and showing_mapping_instructions:
                 overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -1230,11 +1345,11 @@ def main(screen):
                 overlay.set_alpha(200)
                 screen.blit(overlay, (0, 0))
 
-                font_title = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 32)
-                font_body = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 20)
+                font_title = get_font(32)
+                font_body = get_font(20)
 
                 if current_state == GROUND_MAPPING:
-                    title = font_title.render("Ground Mapping - Instructions", True, (255, 105, 180))
+                    title = render_text(font_title, "Ground Mapping - Instructions", True, (255, 105, 180))
                     screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, SCREEN_HEIGHT // 6))
 
                     instructions = [
@@ -1245,6 +1360,7 @@ def main(screen):
                         "to map the radiation and locate them.",
                         "",
                         "Use WASD or arrow keys to move.",
+                        "P shows the predicted field on the minimap.",
                         "",
                         "The CPS (counts per second) display shows",
                         "the radiation level at your position.",
@@ -1259,7 +1375,7 @@ def main(screen):
                         "Press SPACE or click to begin!",
                     ]
                 else:
-                    title = font_title.render("Aerial Mapping - Instructions", True, (255, 105, 180))
+                    title = render_text(font_title, "Aerial Mapping - Instructions", True, (255, 105, 180))
                     screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, SCREEN_HEIGHT // 6))
 
                     instructions = [
@@ -1270,6 +1386,7 @@ def main(screen):
                         "the air.",
                         "",
                         "Use WASD or arrow keys to fly.",
+                        "P shows the predicted field on the minimap.",
                         "",
                         "The drone flies above the walls, so you",
                         "can move freely across the whole area.",
@@ -1286,16 +1403,16 @@ def main(screen):
 
                 y_offset = SCREEN_HEIGHT // 6 + title.get_height() + 30
                 for line in instructions:
-                    text = font_body.render(line, True, (255, 255, 255))
+                    text = render_text(font_body, line, True, (255, 255, 255))
                     screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, y_offset))
                     y_offset += text.get_height() + 4
 
             # Teaching mode HUD
             if current_state == TEACHING_MODE:
-                font_hud = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 18)
+                font_hud = get_font(18)
 
                 # Hint bar at top
-                hint = font_hud.render("Walk to the source and press SPACE to measure its spectrum", True, (255, 255, 255))
+                hint = render_text(font_hud, "Walk to the source and press SPACE to measure its spectrum", True, (255, 255, 255))
                 hint_bg = pygame.Surface((hint.get_width() + 10, hint.get_height() + 6))
                 hint_bg.fill((0, 0, 0))
                 hint_bg.set_alpha(180)
@@ -1304,7 +1421,7 @@ def main(screen):
 
                 # Proximity prompt
                 if abs(car_x - source_x) <= 1 and abs(car_y - source_y) <= 1:
-                    prompt = font_hud.render("Press SPACE to measure spectrum!", True, (255, 255, 0))
+                    prompt = render_text(font_hud, "Press SPACE to measure spectrum!", True, (255, 255, 0))
                     prompt_bg = pygame.Surface((prompt.get_width() + 10, prompt.get_height() + 6))
                     prompt_bg.fill((0, 0, 0))
                     prompt_bg.set_alpha(200)
@@ -1318,10 +1435,10 @@ def main(screen):
                     overlay.set_alpha(200)
                     screen.blit(overlay, (0, 0))
 
-                    font_title = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 32)
-                    font_body = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 20)
+                    font_title = get_font(32)
+                    font_body = get_font(20)
 
-                    title = font_title.render("Teaching Mode - Instructions", True, (255, 105, 180))
+                    title = render_text(font_title, "Teaching Mode - Instructions", True, (255, 105, 180))
                     screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, SCREEN_HEIGHT // 6))
 
                     instructions = [
@@ -1347,22 +1464,21 @@ def main(screen):
 
                     y_offset = SCREEN_HEIGHT // 6 + title.get_height() + 30
                     for line in instructions:
-                        text = font_body.render(line, True, (255, 255, 255))
+                        text = render_text(font_body, line, True, (255, 255, 255))
                         screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, y_offset))
                         y_offset += text.get_height() + 4
 
                 # Show spectrum overlay
-                if showing_teaching_spectrum and teaching_spectrum_surface is not None:
-                    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-                    overlay.fill((0, 0, 0))
-                    overlay.set_alpha(150)
-                    screen.blit(overlay, (0, 0))
-                    sp_x = (SCREEN_WIDTH - teaching_spectrum_surface.get_width()) // 2
-                    sp_y = (SCREEN_HEIGHT - teaching_spectrum_surface.get_height()) // 2
-                    screen.blit(teaching_spectrum_surface, (sp_x, sp_y))
-                    dismiss = font_hud.render("Press SPACE or click to close", True, (255, 255, 255))
-                    screen.blit(dismiss, (SCREEN_WIDTH // 2 - dismiss.get_width() // 2,
-                                          sp_y + teaching_spectrum_surface.get_height() + 10))
+                if showing_teaching_spectrum:
+                    # The spectrum builds up every tick; a new frame is rendered whenever the worker is free
+                    teaching_acquisition.accumulate(teaching_spectrum_rate, clock.get_time() / 1000)
+                    if teaching_spectrum_future is not None and teaching_spectrum_future.done():
+                        teaching_spectrum_surface = teaching_spectrum_future.result()
+                        teaching_spectrum_future = None
+                    if teaching_spectrum_future is None:
+                        teaching_spectrum_future = submit_spectrum_render(
+                            spectrum_worker, teaching_acquisition, int(SCREEN_WIDTH * 0.7), int(SCREEN_HEIGHT * 0.7))
+                    draw_spectrum_overlay(screen, SCREEN_WIDTH, SCREEN_HEIGHT, teaching_spectrum_surface, font_hud)
 
             # Check if the time is up
             if time_left <= 0:
@@ -1370,6 +1486,9 @@ def main(screen):
                     extension = 'ground'
                 elif current_state == AERIAL_MAPPING:
                     extension = 'aerial'
+                if session_recorder is not None:
+                    session_recorder.save()
+                    session_recorder = None
                 current_state = GAME_OVER
 
         if current_state == SPECTRUM_MODE:
@@ -1390,8 +1509,10 @@ def main(screen):
                 if 0 <= new_car_x < GRID_WIDTH and 0 <= new_car_y < GRID_HEIGHT:
                     car_x, car_y = new_car_x, new_car_y
 
+            frame_timer.mark("update")
+
             # Draw the world
-            draw_grass(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, screen, grass_image)
+            screen.blit(grass_background, (0, 0))
 
             # Draw sources with measured highlight
             for i, (sx, sy, isotope) in enumerate(spectrum_sources):
@@ -1402,12 +1523,13 @@ def main(screen):
                          CELL_SIZE + 4, CELL_SIZE + 4), 3)
 
             draw_car(car_x, car_y, car_image, CELL_SIZE, screen)
+            frame_timer.mark("world")
 
             # Draw HUD text
-            font_hud = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 18)
+            font_hud = get_font(18)
 
             # Hint text
-            hint = font_hud.render("Walk to a source and press SPACE to measure", True, (255, 255, 255))
+            hint = render_text(font_hud, "Walk to a source and press SPACE to measure", True, (255, 255, 255))
             hint_bg = pygame.Surface((hint.get_width() + 10, hint.get_height() + 6))
             hint_bg.fill((0, 0, 0))
             hint_bg.set_alpha(180)
@@ -1415,8 +1537,10 @@ def main(screen):
             screen.blit(hint, (SCREEN_WIDTH // 2 - hint.get_width() // 2, 8))
 
             # Score text
-            score_text = font_hud.render(
-                f"Sources measured: {len(measured_sources)}/{len(spectrum_sources)}",
+            score_text = render_dynamic_text(font_hud,
+                f"Sources measured: {len(measured_sources)}/{len(spectrum_sources)}   "
+                f"Correct IDs: {sum(source_guesses[i] == spectrum_sources[i][2] for i in source_guesses)}"
+                f"/{len(spectrum_sources)}",
                 True, (255, 255, 0))
             score_bg = pygame.Surface((score_text.get_width() + 10, score_text.get_height() + 6))
             score_bg.fill((0, 0, 0))
@@ -1425,28 +1549,40 @@ def main(screen):
             screen.blit(score_text, (10, SCREEN_HEIGHT - score_text.get_height() - 12))
 
             # Proximity prompt
-            for i, (sx, sy, isotope) in enumerate(spectrum_sources):
-                if abs(car_x - sx) <= 1 and abs(car_y - sy) <= 1:
-                    prompt = font_hud.render("Press SPACE to measure!", True, (255, 255, 0))
-                    prompt_bg = pygame.Surface((prompt.get_width() + 10, prompt.get_height() + 6))
-                    prompt_bg.fill((0, 0, 0))
-                    prompt_bg.set_alpha(200)
-                    screen.blit(prompt_bg, (SCREEN_WIDTH // 2 - prompt.get_width() // 2 - 5, 35))
-                    screen.blit(prompt, (SCREEN_WIDTH // 2 - prompt.get_width() // 2, 38))
-                    break
+            if spectrum_index.within(car_x, car_y, 1):
+                prompt = render_text(font_hud, "Press SPACE to measure!", True, (255, 255, 0))
+                prompt_bg = pygame.Surface((prompt.get_width() + 10, prompt.get_height() + 6))
+                prompt_bg.fill((0, 0, 0))
+                prompt_bg.set_alpha(200)
+                screen.blit(prompt_bg, (SCREEN_WIDTH // 2 - prompt.get_width() // 2 - 5, 35))
+                screen.blit(prompt, (SCREEN_WIDTH // 2 - prompt.get_width() // 2, 38))
+
+            frame_timer.mark("hud")
 
             # Draw spectrum overlay if showing
-            if showing_spectrum and spectrum_surface is not None:
-                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-                overlay.fill((0, 0, 0))
-                overlay.set_alpha(150)
-                screen.blit(overlay, (0, 0))
-                sp_x = (SCREEN_WIDTH - spectrum_surface.get_width()) // 2
-                sp_y = (SCREEN_HEIGHT - spectrum_surface.get_height()) // 2
-                screen.blit(spectrum_surface, (sp_x, sp_y))
-                dismiss = font_hud.render("Press SPACE or click to close", True, (255, 255, 255))
-                screen.blit(dismiss, (SCREEN_WIDTH // 2 - dismiss.get_width() // 2,
-                                      sp_y + spectrum_surface.get_height() + 10))
+            if showing_spectrum:
+                # The spectrum builds up every tick; a new frame is rendered whenever the worker is free
+                spectrum_acquisition.accumulate(spectrum_rate, clock.get_time() / 1000)
+                if spectrum_future is not None and spectrum_future.done():
+                    spectrum_surface = spectrum_future.result()
+                    spectrum_future = None
+                sx, sy, isotope = spectrum_sources[spectrum_source_index]
+                guess = source_guesses.get(spectrum_source_index)
+                if spectrum_future is None:
+                    # The isotope stays hidden until the player has made their guess
+                    spectrum_title = f"Source {spectrum_source_index + 1}: {isotope if guess else '?'}"
+                    spectrum_future = submit_spectrum_render(
+                        spectrum_worker, spectrum_acquisition, int(SCREEN_WIDTH * 0.7), int(SCREEN_HEIGHT * 0.7),
+                        spectrum_title)
+                if guess is None:
+                    spectrum_status = "Identify it: " + "  ".join(
+                        f"[{n}] {choice}" for n, choice in enumerate(isotope_choices, start=1))
+                else:
+                    auto_isotope, auto_confidence = identify_isotope(ENERGY_BINS, spectrum_acquisition.counts)[0]
+                    spectrum_status = (f"You said {guess}: {'correct' if guess == isotope else 'wrong'}!   "
+                                       f"Auto-ID: {auto_isotope} ({auto_confidence * 100:.0f}%)")
+                draw_spectrum_overlay(screen, SCREEN_WIDTH, SCREEN_HEIGHT, spectrum_surface, font_hud,
+                                      spectrum_status)
 
             # Draw spectrum mode instructions overlay
             if showing_spectrum_instructions:
@@ -1455,10 +1591,10 @@ def main(screen):
                 overlay.set_alpha(200)
                 screen.blit(overlay, (0, 0))
 
-                font_title = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 32)
-                font_body = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 20)
+                font_title = get_font(32)
+                font_body = get_font(20)
 
-                title = font_title.render("Spectrum ID - Instructions", True, (255, 105, 180))
+                title = render_text(font_title, "Spectrum ID - Instructions", True, (255, 105, 180))
                 screen.blit(title, (SCREEN_WIDTH // 2 - title.get_width() // 2, SCREEN_HEIGHT // 6))
 
                 instructions = [
@@ -1476,7 +1612,9 @@ def main(screen):
                     "Eu-152, or Natural Uranium.",
                     "",
                     "Try to identify each source from its",
-                    "characteristic energy peaks!",
+                    "characteristic energy peaks, then press",
+                    "1-4 to name the isotope. You get one",
+                    "guess per source!",
                     "",
                     "Measured sources will be highlighted green.",
                     "",
@@ -1485,7 +1623,7 @@ def main(screen):
 
                 y_offset = SCREEN_HEIGHT // 6 + title.get_height() + 30
                 for line in instructions:
-                    text = font_body.render(line, True, (255, 255, 255))
+                    text = render_text(font_body, line, True, (255, 255, 255))
                     screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, y_offset))
                     y_offset += text.get_height() + 4
 
@@ -1493,20 +1631,35 @@ def main(screen):
             if heatmap_image is None:
                 is_aerial = (extension == "aerial")
                 max_v = 150 if is_aerial else 10000
+                # Repeated passes over a tile are averaged rather than the last one kept
+                count_data = measurements.mean()
+                estimates = localize_sources(measurements.tile_stats(), GRID_WIDTH, GRID_HEIGHT,
+                                             settings['max_sources'], building_features, is_aerial)
+                # The unvisited tiles are filled in from the readings around them
+                filled_data, measured = interpolator.interpolate(measurements.tile_stats())
                 heatmap_image = render_heatmap_surface(
-                    SCREEN_WIDTH, SCREEN_HEIGHT, count_data, floors,
-                    building_features, max_v, source_positions=None, is_aerial=is_aerial)
+                    SCREEN_WIDTH, SCREEN_HEIGHT, filled_data, floors,
+                    building_features, max_v, source_positions=None, is_aerial=is_aerial,
+                    estimates=estimates, measured_mask=measured)
                 heatmap_source_image = render_heatmap_surface(
-                    SCREEN_WIDTH, SCREEN_HEIGHT, count_data, floors,
-                    building_features, max_v, source_positions=mapping_sources, is_aerial=is_aerial)
+                    SCREEN_WIDTH, SCREEN_HEIGHT, filled_data, floors,
+                    building_features, max_v, source_positions=mapping_sources, is_aerial=is_aerial,
+                    estimates=estimates, measured_mask=measured)
+                score = score_survey(count_data, visited_tiles, rate_field, floors, mapping_sources)
+                rank = record_score(player_name, extension, score, level_seed)
+                score_panel = render_score_panel(score, rank, top_scores(extension, 5), get_font(16))
+                heatmap_image.blit(score_panel, (8, 36))
+                heatmap_source_image.blit(score_panel, (8, 36))
                 # Also save smaller versions for Show Maps
                 last_heatmap_data[extension] = {
-                    'count_data': count_data.copy(),
+                    'count_data': filled_data,
+                    'measured': measured,
                     'floors': list(floors),
                     'walls': set(building_features),
                     'max_v': max_v,
                     'source_positions': list(mapping_sources),
                     'is_aerial': is_aerial,
+                    'estimates': estimates,
                 }
 
         if current_state == SHOW_SOURCE:
@@ -1559,27 +1712,21 @@ def main(screen):
             map_disp_w = SCREEN_WIDTH // 2
             map_disp_h = int(SCREEN_HEIGHT / 1.5)
             if 'ground' in last_heatmap_data:
-                d = last_heatmap_data['ground']
-                ground_map = render_heatmap_surface(
-                    map_disp_w, map_disp_h, d['count_data'], d['floors'],
-                    d['walls'], d['max_v'], d['source_positions'], d['is_aerial'])
+                ground_map = get_cached_heatmap_surface(last_heatmap_data['ground'], map_disp_w, map_disp_h)
             else:
                 ground_map = pygame.Surface((map_disp_w, map_disp_h))
                 ground_map.fill((30, 30, 30))
-                no_data_font = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 20)
-                no_data = no_data_font.render("No data yet", True, (180, 180, 180))
+                no_data_font = get_font(20)
+                no_data = render_text(no_data_font, "No data yet", True, (180, 180, 180))
                 ground_map.blit(no_data, (map_disp_w // 2 - no_data.get_width() // 2,
                                           map_disp_h // 2 - no_data.get_height() // 2))
             if 'aerial' in last_heatmap_data:
-                d = last_heatmap_data['aerial']
-                aerial_map = render_heatmap_surface(
-                    map_disp_w, map_disp_h, d['count_data'], d['floors'],
-                    d['walls'], d['max_v'], d['source_positions'], d['is_aerial'])
+                aerial_map = get_cached_heatmap_surface(last_heatmap_data['aerial'], map_disp_w, map_disp_h)
             else:
                 aerial_map = pygame.Surface((map_disp_w, map_disp_h))
                 aerial_map.fill((30, 30, 30))
-                no_data_font = pygame.font.Font("font/PixeloidMono-d94EV.ttf", 20)
-                no_data = no_data_font.render("No data yet", True, (180, 180, 180))
+                no_data_font = get_font(20)
+                no_data = render_text(no_data_font, "No data yet", True, (180, 180, 180))
                 aerial_map.blit(no_data, (map_disp_w // 2 - no_data.get_width() // 2,
                                           map_disp_h // 2 - no_data.get_height() // 2))
 
@@ -1607,25 +1754,150 @@ def main(screen):
                 else:
                     button.draw(screen, FONT_COLOR)
 
-        pygame.display.update()
-
+        # Adjust the speed of the game
         if current_state == GROUND_MAPPING or current_state == TEACHING_MODE or current_state == SPECTRUM_MODE:
-            clock.tick(10)  # Adjust the speed of the game
+            target_fps = 10
         elif current_state == AERIAL_MAPPING:
-            clock.tick(25)  # Adjust the speed of the game
+            target_fps = 25
         else:
-            clock.tick(60)
+            target_fps = 60
+
+        if show_frame_stats:
+            # Refreshed twice a second so the panel is readable and cheap to draw
+            if frame_stats_panel is None or pygame.time.get_ticks() >= frame_stats_refresh:
+                frame_stats_panel = render_frame_stats(frame_timer, target_fps, get_font(14))
+                frame_stats_refresh = pygame.time.get_ticks() + 500
+            screen.blit(frame_stats_panel, (SCREEN_WIDTH - frame_stats_panel.get_width() - 8,
+                                            SCREEN_HEIGHT - frame_stats_panel.get_height() - 8))
+        frame_timer.mark("overlays")
+
+        pygame.display.update()
+        frame_timer.mark("display")
+
+        clock.tick(target_fps)
+        frame_timer.mark("wait")
         prev_state = current_state
 
 
+def replay_session(screen, session, speed=1.0):
+    """Play back a recorded mapping session at its original tick rate times speed, then show
+    the final heatmap with the sources. A key press or click skips ahead, then exits."""
+    SCREEN_WIDTH, SCREEN_HEIGHT = screen.get_size()
+    GRID_SIZE = 30
+    GRID_WIDTH, GRID_HEIGHT = session.GRID_WIDTH, session.GRID_HEIGHT
+
+    grass_image = pygame.transform.scale(pygame.image.load("textures/grass.png"), (GRID_SIZE, GRID_SIZE))
+    floor_image = pygame.transform.scale(pygame.image.load("textures/floor.jpg"), (GRID_SIZE, GRID_SIZE))
+    wall_image = pygame.transform.scale(pygame.image.load("textures/redbrick.png"), (GRID_SIZE, GRID_SIZE))
+    if session.is_aerial:
+        car_image = pygame.transform.scale(pygame.image.load("textures/drone.png"), (GRID_SIZE * 3, GRID_SIZE * 3))
+    else:
+        car_image = pygame.transform.scale(pygame.image.load("textures/man_front.png"), (GRID_SIZE * 2, GRID_SIZE * 2))
+
+    level_background = build_level_background(GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, grass_image, floor_image,
+                                              session.floors, wall_image, session.building_features)
+    minimap = Minimap(220, GRID_WIDTH, GRID_HEIGHT, session.floors, session.building_features,
+                      50 if session.is_aerial else 500)
+    font_hud = get_font(20)
+    clock = pygame.time.Clock()
+    tick_rate = (25 if session.is_aerial else 10) * speed
+
+    def skipped():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.KEYDOWN or (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1):
+                return True
+        return False
+
+    for record in session.records:
+        if skipped():
+            break
+        x, y, counts = int(record["x"]), int(record["y"]), int(record["counts"])
+        minimap.update_tile(x, y, counts)
+        screen.blit(level_background, (0, 0))
+        draw_car(x, y, car_image, GRID_SIZE, screen)
+        draw_counts(counts, x * GRID_SIZE, y * GRID_SIZE, screen)
+        minimap.draw(screen, 8, SCREEN_HEIGHT - minimap.height - 40, x, y)
+        status = render_dynamic_text(font_hud, f"Replay  {record['time_ms'] / 1000:5.1f} s  (any key to skip)",
+                                     True, (255, 255, 255))
+        screen.blit(status, (SCREEN_WIDTH - status.get_width() - 10, 10))
+        pygame.display.update()
+        clock.tick(tick_rate)
+
+    # Same view, fill, scale and estimates as the GAME_OVER heatmap
+    tile_stats = session.measurements.tile_stats()
+    estimates = localize_sources(tile_stats, GRID_WIDTH, GRID_HEIGHT, session.max_sources,
+                                 session.building_features, session.is_aerial)
+    interpolator = FieldInterpolator(GRID_WIDTH, GRID_HEIGHT, () if session.is_aerial else session.building_features)
+    filled_data, measured = interpolator.interpolate(tile_stats)
+    heatmap = render_heatmap_surface(SCREEN_WIDTH, SCREEN_HEIGHT, filled_data,
+                                     session.floors, session.building_features, 150 if session.is_aerial else 10000,
+                                     session.sources, session.is_aerial, estimates, measured)
+    screen.blit(heatmap, (0, 0))
+    pygame.display.update()
+    while not skipped():
+        clock.tick(30)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Radmapper radiation mapping game.")
+    parser.add_argument("--profile-startup", nargs="?", const="startup_profile.log", default=None, metavar="LOG",
+                        help="report time spent in imports, texture loading and display setup, "
+                             "appending it to LOG (default: startup_profile.log)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for every random choice in the session, so a run can be reproduced exactly")
+    parser.add_argument("--frame-csv", default=None, metavar="CSV",
+                        help="write the per-section time of every frame to CSV (F3 shows them in game)")
+    parser.add_argument("--player", default="Player",
+                        help="name recorded with this session's scores on the leaderboard")
+    parser.add_argument("--replay", default=None, metavar="SESSION",
+                        help="play back a session recorded in sessions/ instead of starting the game")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="playback speed multiplier for --replay")
+    parser.add_argument("--headless", action="store_true",
+                        help="with --replay, fast-forward the session without a window and print its summary")
+    args = parser.parse_args()
+
+    if args.replay is not None and args.headless:
+        replay_start = time.perf_counter()
+        session = Session(args.replay)
+        count_data = session.count_data_at(view="mean")
+        stats = session.measurements.tile_stats()
+        estimates = localize_sources(stats, session.GRID_WIDTH, session.GRID_HEIGHT, session.max_sources,
+                                     session.building_features, session.is_aerial)
+        rate_field = compute_count_rate_field(
+            session.GRID_WIDTH, session.GRID_HEIGHT, session.sources,
+            build_transmission_cache(session.wall_materials, session.GRID_WIDTH, session.GRID_HEIGHT),
+            is_aerial=session.is_aerial)
+        score = score_survey(count_data, list(zip(stats["x"], stats["y"])), rate_field, session.floors,
+                             session.sources)
+        for key, value in session.summary().items():
+            print(f"{key}: {value}")
+        print(f"score: {score}")
+        for (ex, ey, strength, uncertainty), source, error in match_estimates(estimates, session.sources):
+            print(f"estimated source: ({ex}, {ey}) +/- {uncertainty:.1f}, strength {strength:.0f}, "
+                  f"error {'-' if error is None else f'{error:.1f}'}")
+        print(f"loaded, replayed, scored and localized in {(time.perf_counter() - replay_start) * 1000:.1f} ms")
+        sys.exit()
+
+    startup_profiler = StartupProfiler()
+    startup_profiler.add("imports", _IMPORT_SECONDS)
+
     # Initialize Pygame
-    pygame.init()
-    pygame.mixer.init()
-    pygame.font.init()
+    with startup_profiler.phase("pygame init"):
+        pygame.init()
+        pygame.mixer.init()
+        pygame.font.init()
 
     # Create the screen
     infoObject = pygame.display.Info()
     #screen = pygame.display.set_mode((infoObject.current_w, infoObject.current_h), pygame.RESIZABLE)
-    screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-    main(screen)
+    with startup_profiler.phase("display.set_mode"):
+        screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    if args.replay is not None:
+        replay_session(screen, Session(args.replay), args.replay_speed)
+        pygame.quit()
+        sys.exit()
+    main(screen, startup_profiler, args.profile_startup, FrameTimer(csv_path=args.frame_csv), args.seed,
+         args.player)
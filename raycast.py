@@ -0,0 +1,157 @@
+import numpy as np
+
+
+def wall_grid(wall_positions, GRID_WIDTH, GRID_HEIGHT):
+    """Return a boolean (GRID_HEIGHT, GRID_WIDTH) occupancy grid for a collection of (x, y) walls.
+    Walls outside the grid are ignored."""
+    grid = np.zeros((GRID_HEIGHT, GRID_WIDTH), dtype=bool)
+    if len(wall_positions) == 0:
+        return grid
+    xs, ys = np.array(list(wall_positions), dtype=int).T
+    inside = (xs >= 0) & (xs < GRID_WIDTH) & (ys >= 0) & (ys < GRID_HEIGHT)
+    grid[ys[inside], xs[inside]] = True
+    return grid
+
+
+def _march_rays(values, x0, y0, x1, y1):
+    """Sum values[y, x] over the interior cells of a batch of Bresenham rays, marching all
+    rays together. Each ray follows exactly the same walk as has_line_of_sight, and its two
+    endpoints are never included."""
+    x0, y0, x1, y1 = np.broadcast_arrays(*(np.asarray(v, dtype=np.int64) for v in (x0, y0, x1, y1)))
+    shape = x0.shape
+    x = x0.ravel().copy()
+    y = y0.ravel().copy()
+    x1 = x1.ravel()
+    y1 = y1.ravel()
+
+    dx = np.abs(x1 - x)
+    dy = np.abs(y1 - y)
+    sx = np.where(x < x1, 1, -1)
+    sy = np.where(y < y1, 1, -1)
+    err = dx - dy
+    # Every Bresenham step moves x, y or both, so a ray has max(dx, dy) steps
+    remaining = np.maximum(dx, dy)
+
+    flat_values = values.ravel()
+    grid_w = values.shape[1]
+    total = np.zeros(x.shape, dtype=np.result_type(flat_values.dtype, np.int64))
+
+    for _ in range(int(remaining.max(initial=0))):
+        moving = remaining > 0
+        e2 = 2 * err
+        step_x = moving & (e2 > -dy)
+        step_y = moving & (e2 < dx)
+        err -= dy * step_x
+        err += dx * step_y
+        x += sx * step_x
+        y += sy * step_y
+        remaining -= moving
+        # The last step lands on the target, which is excluded like the source
+        interior = moving & (remaining > 0)
+        total += np.where(interior, flat_values[y * grid_w + x], 0)
+
+    return total.reshape(shape)
+
+
+def count_walls_crossed(walls, x0, y0, x1, y1):
+    """
+    Count the wall cells crossed by a batch of rays.
+
+    Parameters:
+    - walls: A 2D boolean numpy array, True where there is a wall.
+    - x0, y0: Integer arrays (or scalars) with the start cell of every ray.
+    - x1, y1: Integer arrays (or scalars) with the end cell of every ray.
+
+    Returns:
+    - An integer array with the broadcast shape of the inputs.
+    """
+    return _march_rays(walls, x0, y0, x1, y1)
+
+
+def ray_interior_offsets(dx, dy):
+    """Return the cells strictly between (0, 0) and (dx, dy) on the Bresenham walk that
+    has_line_of_sight and _march_rays take, as a list of (x, y) offsets from (0, 0).
+    The walk only depends on the offset, so one list serves every ray with that offset."""
+    x, y = 0, 0
+    adx, ady = abs(dx), abs(dy)
+    sx = 1 if dx > 0 else -1
+    sy = 1 if dy > 0 else -1
+    err = adx - ady
+    cells = []
+    for remaining in range(max(adx, ady), 0, -1):
+        e2 = 2 * err
+        if e2 > -ady:
+            err -= ady
+            x += sx
+        if e2 < adx:
+            err += adx
+            y += sy
+        if remaining > 1:
+            cells.append((x, y))
+    return cells
+
+
+def visibility_mask(walls, source_x, source_y):
+    """Return a boolean mask of the grid cells with line of sight to (source_x, source_y).
+
+    mask[y, x] equals has_line_of_sight(x, y, source_x, source_y, walls), i.e. the ray is
+    walked from each cell towards the source, as the detector does."""
+    grid_h, grid_w = walls.shape
+    ys, xs = np.mgrid[0:grid_h, 0:grid_w]
+    return count_walls_crossed(walls, xs, ys, source_x, source_y) == 0
+
+
+def attenuation_grid(wall_materials, coefficients, GRID_WIDTH, GRID_HEIGHT):
+    """Return a (GRID_HEIGHT, GRID_WIDTH) float grid holding the attenuation coefficient of
+    the wall in each cell (0 where there is no wall).
+    wall_materials maps (x, y) -> material name, coefficients maps material name -> mu."""
+    grid = np.zeros((GRID_HEIGHT, GRID_WIDTH))
+    for (x, y), material in wall_materials.items():
+        if 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT:
+            grid[y, x] = coefficients[material]
+    return grid
+
+
+def transmission_maps(mu_grid, sources):
+    """
+    Compute the transmitted fraction exp(-sum(mu * n)) from every grid cell to each source.
+
+    All rays for all sources are marched in one batch.
+
+    Parameters:
+    - mu_grid: A 2D array of per-cell attenuation coefficients, as from attenuation_grid.
+    - sources: A list of (x, y) source cells.
+
+    Returns:
+    - A (len(sources), GRID_HEIGHT, GRID_WIDTH) numpy array of values in (0, 1].
+    """
+    grid_h, grid_w = mu_grid.shape
+    if len(sources) == 0:
+        return np.ones((0, grid_h, grid_w))
+    ys, xs = np.mgrid[0:grid_h, 0:grid_w]
+    src_x, src_y = np.array(sources, dtype=int).T
+    depth = _march_rays(mu_grid, xs[None], ys[None], src_x[:, None, None], src_y[:, None, None])
+    return np.exp(-depth)
+
+
+class TransmissionCache:
+    """Per-level cache of source transmission maps, so each is computed only once."""
+
+    def __init__(self, mu_grid):
+        self.mu_grid = mu_grid
+        self._maps = {}
+
+    def get_many(self, sources):
+        """Return a (len(sources), GRID_HEIGHT, GRID_WIDTH) stack of transmission maps."""
+        missing = [s for s in dict.fromkeys(map(tuple, sources)) if s not in self._maps]
+        if missing:
+            for source, tmap in zip(missing, transmission_maps(self.mu_grid, missing)):
+                self._maps[source] = tmap
+        grid_h, grid_w = self.mu_grid.shape
+        if len(sources) == 0:
+            return np.ones((0, grid_h, grid_w))
+        return np.stack([self._maps[tuple(s)] for s in sources])
+
+    def get(self, source_x, source_y):
+        """Return the transmission map for a single source."""
+        return self.get_many([(source_x, source_y)])[0]
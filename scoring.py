@@ -0,0 +1,100 @@
+"""Scoring a finished mapping level against the true count-rate field, and the leaderboard.
+
+A survey is judged on three things, each computed over the whole grid at once:
+- coverage: the fraction of the building's floor tiles that were measured;
+- accuracy: how close the mapped readings are to the expected readings of the level
+  (its count-rate field, walls included), as one minus the RMS error over the visited
+  tiles relative to the RMS of the expected readings there;
+- peak: how close the hottest mapped tile is to a real source, falling off over
+  PEAK_DISTANCE_SCALE tiles.
+
+The score is their SCORE_WEIGHTS-weighted sum, out of 1000. Every scored level is
+appended to a local JSON leaderboard, so competitions can be run on one machine.
+"""
+import json
+import os
+import time
+import numpy as np
+from raycast import wall_grid
+
+SCORE_WEIGHTS = {"coverage": 400, "accuracy": 300, "peak": 300}
+PEAK_DISTANCE_SCALE = 3.0
+# Readings are capped at this many counts by the game, so the expected readings are too
+READING_CAP = 10000
+
+LEADERBOARD_PATH = "leaderboard.json"
+
+
+def score_survey(count_data, visited_tiles, rate_field, floors, sources):
+    """
+    Score a finished mapping level.
+
+    Parameters:
+    - count_data: The player's (GRID_HEIGHT, GRID_WIDTH) map of readings.
+    - visited_tiles: The (x, y) tiles the detector measured.
+    - rate_field: The level's expected CPS at every tile, from compute_count_rate_field.
+    - floors: The building's floor tiles.
+    - sources: The true (x, y) source positions.
+
+    Returns:
+    - A dict with coverage (0-1), rms_error (CPS), accuracy (0-1), peak_distance (tiles
+      from the hottest visited tile to the nearest source, None if nothing was measured)
+      and score (0-1000).
+    """
+    GRID_HEIGHT, GRID_WIDTH = count_data.shape
+    visited = wall_grid(visited_tiles, GRID_WIDTH, GRID_HEIGHT)
+    floor_mask = wall_grid(floors, GRID_WIDTH, GRID_HEIGHT)
+    coverage = float((visited & floor_mask).sum()) / max(1, int(floor_mask.sum()))
+
+    expected = np.minimum(rate_field, READING_CAP)[visited]
+    measured = count_data[visited]
+    if len(measured) == 0:
+        return {"coverage": coverage, "rms_error": 0.0, "accuracy": 0.0, "peak_distance": None,
+                "score": int(round(SCORE_WEIGHTS["coverage"] * coverage))}
+    rms_error = float(np.sqrt(np.mean((measured - expected) ** 2)))
+    accuracy = max(0.0, 1.0 - rms_error / max(float(np.sqrt(np.mean(expected ** 2))), 1e-9))
+
+    # The hottest visited tile, and its distance to the nearest source
+    masked = np.where(visited, count_data, -np.inf)
+    peak_y, peak_x = np.unravel_index(np.argmax(masked), masked.shape)
+    source_xy = np.array(sources, dtype=float).reshape(-1, 2)
+    peak_distance = float(np.sqrt(((source_xy - (peak_x, peak_y)) ** 2).sum(axis=1)).min(initial=np.inf))
+    peak = float(np.exp(-peak_distance / PEAK_DISTANCE_SCALE))
+
+    score = (SCORE_WEIGHTS["coverage"] * coverage + SCORE_WEIGHTS["accuracy"] * accuracy +
+             SCORE_WEIGHTS["peak"] * peak)
+    return {"coverage": coverage, "rms_error": rms_error, "accuracy": accuracy,
+            "peak_distance": peak_distance if np.isfinite(peak_distance) else None,
+            "score": int(round(score))}
+
+
+def load_leaderboard(path=LEADERBOARD_PATH):
+    """Return the list of leaderboard entries in path, or [] if there is none yet."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def record_score(name, mode, result, level_seed=None, path=LEADERBOARD_PATH):
+    """Append a score_survey result to the leaderboard and return its rank among the
+    scores of the same mode (1 is best)."""
+    entries = load_leaderboard(path)
+    entry = dict(result, name=name, mode=mode, level_seed=None if level_seed is None else str(level_seed),
+                 time=time.strftime("%Y-%m-%d %H:%M:%S"))
+    entries.append(entry)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Written to a temporary file first, so a crash never leaves a half-written leaderboard
+    with open(path + ".tmp", "w") as f:
+        json.dump(entries, f, indent=1)
+    os.replace(path + ".tmp", path)
+    return 1 + sum(1 for other in entries if other["mode"] == mode and other["score"] > entry["score"])
+
+
+def top_scores(mode, count=10, path=LEADERBOARD_PATH):
+    """Return the best count leaderboard entries of a mode, best first."""
+    entries = [entry for entry in load_leaderboard(path) if entry["mode"] == mode]
+    return sorted(entries, key=lambda entry: entry["score"], reverse=True)[:count]
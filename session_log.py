@@ -0,0 +1,127 @@
+"""Recording and replay of mapping sessions.
+
+Every tick of a GROUND_MAPPING or AERIAL_MAPPING session is appended to the
+MeasurementStore of a SessionRecorder as one record of SESSION_DTYPE. A finished session is saved as a
+small .npz holding the records plus what is needed to rebuild the level: the level seed,
+mode, grid size and source limit. A window resized mid-level keeps the same level on a
+new grid, so the grid the level was generated on and the grid it was last played on are
+stored separately. Replaying a session rebuilds the level from its seed
+and writes the recorded readings back, so a session loads and fast-forwards in
+milliseconds:
+
+    python radmapper.py --replay sessions/session_ground_20240101-120000.npz
+    python radmapper.py --replay sessions/session_ground_20240101-120000.npz --headless
+"""
+import os
+import time
+import numpy as np
+from measurements import MEASUREMENT_DTYPE, MeasurementStore
+from raycast import wall_grid
+from simulation import generate_level
+
+# One record per game tick
+SESSION_DTYPE = MEASUREMENT_DTYPE
+
+SESSIONS_DIR = "sessions"
+
+
+class SessionRecorder:
+    """Append-only log of the ticks of one mapping session, kept in a MeasurementStore."""
+
+    def __init__(self, seed, level_seed, mode, GRID_WIDTH, GRID_HEIGHT, max_sources, chunk_size=1024):
+        self.meta = {
+            "seed": seed,
+            "level_seed": level_seed,
+            "mode": mode,
+            "grid_width": GRID_WIDTH,
+            "grid_height": GRID_HEIGHT,
+            "level_width": GRID_WIDTH,
+            "level_height": GRID_HEIGHT,
+            "max_sources": max_sources,
+        }
+        self.measurements = MeasurementStore(GRID_WIDTH, GRID_HEIGHT, chunk_size)
+
+    @property
+    def ticks(self):
+        return self.measurements.ticks
+
+    def append(self, time_ms, x, y, counts):
+        """Record one tick."""
+        self.measurements.append(time_ms, x, y, counts)
+
+    def resize(self, GRID_WIDTH, GRID_HEIGHT):
+        """Move the session onto a new grid after a window resize. The level itself, and so
+        the grid it was generated on, stays the same."""
+        self.meta["grid_width"] = GRID_WIDTH
+        self.meta["grid_height"] = GRID_HEIGHT
+        self.measurements.resize(GRID_WIDTH, GRID_HEIGHT)
+
+    def records(self):
+        """Return all records so far as one SESSION_DTYPE array."""
+        return self.measurements.records()
+
+    def save(self, path=None):
+        """Write the session to path (default: a timestamped file in SESSIONS_DIR) and
+        return the path."""
+        if path is None:
+            path = os.path.join(SESSIONS_DIR, f"session_{self.meta['mode']}_{time.strftime('%Y%m%d-%H%M%S')}.npz")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Seeds can exceed 64 bits, so they are stored as strings
+        np.savez_compressed(path, records=self.records(), seed=str(self.meta["seed"]),
+                            level_seed=str(self.meta["level_seed"]), mode=self.meta["mode"],
+                            grid_width=self.meta["grid_width"], grid_height=self.meta["grid_height"],
+                            level_width=self.meta["level_width"], level_height=self.meta["level_height"],
+                            max_sources=self.meta["max_sources"])
+        return path
+
+
+class Session:
+    """A recorded session loaded from disk, with its level rebuilt from the level seed.
+
+    GRID_WIDTH and GRID_HEIGHT are the grid the session ended on, which the maps, fields
+    and scores are built on; readings taken outside it before a resize are left out."""
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.records = data["records"]
+            self.seed = int(str(data["seed"]))
+            self.level_seed = int(str(data["level_seed"]))
+            self.mode = str(data["mode"])
+            self.GRID_WIDTH = int(data["grid_width"])
+            self.GRID_HEIGHT = int(data["grid_height"])
+            self.max_sources = int(data["max_sources"])
+            # Sessions saved before resizes were recorded were generated on their only grid
+            level_width = int(data["level_width"]) if "level_width" in data else self.GRID_WIDTH
+            level_height = int(data["level_height"]) if "level_height" in data else self.GRID_HEIGHT
+        self.is_aerial = self.mode == "aerial"
+        self.measurements = MeasurementStore.from_records(self.records, self.GRID_WIDTH, self.GRID_HEIGHT)
+
+        building_features_list, self.floors, self.wall_materials, self.sources = generate_level(
+            level_width, level_height, self.max_sources, np.random.default_rng(self.level_seed))
+        self.building_features = set(building_features_list)
+
+    def count_data_at(self, tick=None, view="last"):
+        """Return the (GRID_HEIGHT, GRID_WIDTH) map of readings as it stood after tick
+        (default: the end of the session). view is the MeasurementStore view to build:
+        "last" (as the live game shows it), "mean", "max" or "sample_count"."""
+        return getattr(self.measurements, view)(tick)
+
+    def summary(self):
+        """Return the headline numbers of the session as a dict."""
+        visited = self.measurements.tile_stats()
+        # Floor tiles measured, as score_survey counts them; the drone also visits grass
+        floor_mask = wall_grid(self.floors, self.GRID_WIDTH, self.GRID_HEIGHT)
+        floors_visited = int(floor_mask[visited["y"], visited["x"]].sum())
+        return {
+            "mode": self.mode,
+            "level_seed": self.level_seed,
+            "ticks": len(self.records),
+            "duration_s": float(self.records["time_ms"].max(initial=0)) / 1000,
+            "visited_tiles": len(visited),
+            "coverage": floors_visited / max(1, int(floor_mask.sum())),
+            "samples_per_tile": float(visited["samples"].mean()) if len(visited) else 0.0,
+            "peak_cps": int(visited["max"].max(initial=0)),
+            "sources": self.sources,
+        }
@@ -15,7 +15,10 @@ target = Executable(
 
 setup(
     name="Radmapper V1.6",
-    options={"build_exe": {"packages":["pygame", "numpy", "matplotlib", "random", "time", "sys"],
+    # matplotlib is only imported lazily for optional PNG export, so bundle just the pieces it uses
+    options={"build_exe": {"packages":["pygame", "numpy", "random", "time", "sys"],
+                           "includes":["matplotlib.figure", "matplotlib.backends.backend_agg"],
+                           "excludes":["tkinter", "matplotlib.tests", "matplotlib.backends.backend_tkagg"],
                            "include_files":["font", "music", "plots", "textures"]}},
     executables = [target]
 
@@ -0,0 +1,275 @@
+"""Headless radiation mapping: building generation, source placement and the detector
+count model used by GROUND_MAPPING and AERIAL_MAPPING, with no pygame dependency.
+
+All randomness comes from a numpy Generator passed in by the caller, so a level and its
+readings are reproduced exactly from the seed the Generator was made with."""
+import math
+import numpy as np
+from raycast import attenuation_grid, TransmissionCache
+from spatial_index import SpatialIndex
+
+# Linear attenuation coefficient per wall cell crossed, by wall material.
+# One brick wall halves the signal; internal partitions are lighter.
+WALL_ATTENUATION = {
+    "brick": math.log(2),
+    "plaster": 0.35,
+}
+
+
+def has_line_of_sight(source_x, source_y, target_x, target_y, wall_positions):
+    """Check line of sight using Bresenham's line algorithm."""
+    x0, y0 = source_x, source_y
+    x1, y1 = target_x, target_y
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    err = dx - dy
+
+    while True:
+        if (x0, y0) != (source_x, source_y) and (x0, y0) != (target_x, target_y):
+            if (x0, y0) in wall_positions:
+                return False
+        if x0 == x1 and y0 == y1:
+            break
+        e2 = 2 * err
+        if e2 > -dy:
+            err -= dy
+            x0 += sx
+        if e2 < dx:
+            err += dx
+            y0 += sy
+
+    return True
+
+
+def distance_squared(x1, y1, x2, y2):
+    return ((x2 - x1) ** 2 + (y2 - y1) ** 2) + 0.1
+
+
+def distance_squared_3D(x1, y1, x2, y2):
+    return ((x2 - x1) ** 2 + (y2 - y1) ** 2 + 10 ** 2) + 0.1
+
+
+def compute_count_rate_field(GRID_WIDTH, GRID_HEIGHT, sources, transmission, is_aerial=False):
+    """Return the expected CPS at every grid cell as a (GRID_HEIGHT, GRID_WIDTH) array.
+
+    Background is included, so one Poisson draw on a cell gives a detector reading.
+    Computed once per level; a sum of Poisson draws is itself Poisson, so this matches
+    drawing each source separately every tick. transmission is the level's
+    TransmissionCache; the drone flies above the walls, so aerial fields ignore it."""
+    ys, xs = np.mgrid[0:GRID_HEIGHT, 0:GRID_WIDTH]
+    field = np.full((GRID_HEIGHT, GRID_WIDTH), 7 / 3 if is_aerial else 7, dtype=float)
+
+    if is_aerial:
+        for (sx, sy) in sources:
+            field += 10000 / distance_squared_3D(xs, ys, sx, sy)
+        return field
+
+    for (sx, sy), tmap in zip(sources, transmission.get_many(sources)):
+        field += 10000 * tmap / distance_squared(xs, ys, sx, sy)
+
+    return field
+
+
+def build_transmission_cache(wall_materials, GRID_WIDTH, GRID_HEIGHT):
+    """Return a TransmissionCache for a level's tagged walls."""
+    return TransmissionCache(attenuation_grid(wall_materials, WALL_ATTENUATION, GRID_WIDTH, GRID_HEIGHT))
+
+
+def _randint(rng, low, high):
+    """Random integer in [low, high], both inclusive, like random.randint."""
+    return int(rng.integers(low, high + 1))
+
+
+def generate_random_building(GRID_WIDTH, GRID_HEIGHT, rng=None):
+    """Generate a randomized building layout with outer walls and random internal rooms,
+    drawing from the numpy Generator rng (a fresh unseeded one if not given).
+    Returns (building_features, floors, wall_materials), where wall_materials maps each
+    wall (x, y) to a WALL_ATTENUATION material name."""
+    rng = rng if rng is not None else np.random.default_rng()
+    building_features = []
+    wall_materials = {}
+    floors = []
+    margin = 5
+    inner_left = margin
+    inner_right = GRID_WIDTH - margin
+    inner_top = margin
+    inner_bottom = GRID_HEIGHT - margin
+
+    # Floors
+    for y in range(inner_top, inner_bottom):
+        for x in range(inner_left, inner_right):
+            floors.append((x, y))
+
+    def add_wall(x, y, material):
+        if (x, y) not in wall_materials:
+            wall_materials[(x, y)] = material
+            building_features.append((x, y))
+
+    # Front wall (top) - solid
+    for x in range(inner_left, inner_right + 1):
+        add_wall(x, inner_top, "brick")
+
+    # Back wall (bottom) - door in middle
+    door_center = GRID_WIDTH // 2
+    for x in range(inner_left, inner_right + 1):
+        if x != door_center and x != door_center + 1:
+            add_wall(x, inner_bottom, "brick")
+
+    # Left wall
+    for y in range(inner_top, inner_bottom + 1):
+        add_wall(inner_left, y, "brick")
+
+    # Right wall
+    for y in range(inner_top, inner_bottom + 1):
+        add_wall(inner_right, y, "brick")
+
+    # Random internal walls
+    num_h = _randint(rng, 1, 2)
+    num_v = _randint(rng, 1, 2)
+
+    # Pick horizontal wall y positions with minimum spacing
+    h_positions = []
+    for _ in range(50):
+        if len(h_positions) >= num_h:
+            break
+        y = _randint(rng, inner_top + 4, inner_bottom - 4)
+        if all(abs(y - hy) >= 5 for hy in h_positions):
+            h_positions.append(y)
+
+    # Pick vertical wall x positions with minimum spacing
+    v_positions = []
+    for _ in range(50):
+        if len(v_positions) >= num_v:
+            break
+        x = _randint(rng, inner_left + 4, inner_right - 4)
+        if all(abs(x - vx) >= 5 for vx in v_positions):
+            v_positions.append(x)
+
+    # Add horizontal walls with doorways
+    for wy in h_positions:
+        door_x = _randint(rng, inner_left + 2, inner_right - 3)
+        for x in range(inner_left + 1, inner_right):
+            if x != door_x and x != door_x + 1:
+                add_wall(x, wy, "plaster")
+
+    # Add vertical walls with doorways in each horizontal segment
+    for wx in v_positions:
+        y_bounds = sorted([inner_top] + h_positions + [inner_bottom])
+        for i in range(len(y_bounds) - 1):
+            seg_start = y_bounds[i] + 1
+            seg_end = y_bounds[i + 1]
+            if seg_end - seg_start < 4:
+                continue
+            door_y = _randint(rng, seg_start + 1, seg_end - 3)
+            for y in range(seg_start, seg_end):
+                if y != door_y and y != door_y + 1:
+                    add_wall(wx, y, "plaster")
+
+    return building_features, floors, wall_materials
+
+
+def place_mapping_sources(num_sources, GRID_WIDTH, GRID_HEIGHT, wall_positions, rng=None):
+    """Randomly place num_sources mapping sources away from walls and at least 4 cells apart,
+    drawing from the numpy Generator rng."""
+    rng = rng if rng is not None else np.random.default_rng()
+    index = SpatialIndex(walls=wall_positions)
+    sources = []
+    for _ in range(num_sources):
+        sx, sy = _randint(rng, 6, GRID_WIDTH - 6), _randint(rng, 6, GRID_HEIGHT - 6)
+        while index.too_close(sx, sy, 4):
+            sx, sy = _randint(rng, 6, GRID_WIDTH - 6), _randint(rng, 6, GRID_HEIGHT - 6)
+        index.insert(sx, sy)
+        sources.append((sx, sy))
+    return sources
+
+
+def generate_level(GRID_WIDTH, GRID_HEIGHT, max_sources, rng):
+    """Generate a mapping level: a building and 1 to max_sources hidden sources.
+    Returns (building_features, floors, wall_materials, sources). The game, Simulation and
+    session replay all build levels through here, so a level seed gives the same level
+    everywhere."""
+    building_features, floors, wall_materials = generate_random_building(GRID_WIDTH, GRID_HEIGHT, rng)
+    num_sources = _randint(rng, 1, max_sources)
+    sources = place_mapping_sources(num_sources, GRID_WIDTH, GRID_HEIGHT, set(building_features), rng)
+    return building_features, floors, wall_materials, sources
+
+
+class Simulation:
+    """
+    A mapping session that runs without a display.
+
+    Each call to step() is one game tick: the detector moves by (dx, dy) under the same
+    rules as main() and takes one reading from the level's count-rate field. The session
+    ends after duration seconds at tick_rate ticks per second, matching the game clock.
+
+    Parameters:
+    - GRID_WIDTH, GRID_HEIGHT: Grid size in cells.
+    - mode: "ground" or "aerial".
+    - max_sources: Upper bound on the number of hidden sources (at least one is placed).
+    - duration: Session length in seconds (defaults to the game's 35 s ground, 20 s aerial).
+    - tick_rate: Ticks per second (defaults to the game's 10 ground, 25 aerial).
+    - rng: numpy Generator for the level layout and the readings; a session is
+      reproducible from the seed it was made with.
+    """
+
+    def __init__(self, GRID_WIDTH, GRID_HEIGHT, mode="ground", max_sources=3, duration=None, tick_rate=None,
+                 rng=None):
+        if mode not in ("ground", "aerial"):
+            raise ValueError(f"Unknown mapping mode: {mode}")
+        self.GRID_WIDTH = GRID_WIDTH
+        self.GRID_HEIGHT = GRID_HEIGHT
+        self.mode = mode
+        self.is_aerial = mode == "aerial"
+        self.duration = duration if duration is not None else (20 if self.is_aerial else 35)
+        self.tick_rate = tick_rate if tick_rate is not None else (25 if self.is_aerial else 10)
+        self.max_ticks = int(self.duration * self.tick_rate)
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        building_features_list, self.floors, self.wall_materials, self.sources = generate_level(
+            GRID_WIDTH, GRID_HEIGHT, max_sources, self.rng)
+        self.building_features = set(building_features_list)
+        self.transmission = build_transmission_cache(self.wall_materials, GRID_WIDTH, GRID_HEIGHT)
+        self.rate_field = compute_count_rate_field(GRID_WIDTH, GRID_HEIGHT, self.sources, self.transmission,
+                                                   is_aerial=self.is_aerial)
+
+        self.car_x, self.car_y = GRID_WIDTH // 2, GRID_HEIGHT - 2
+        self.count_data = np.zeros((GRID_HEIGHT, GRID_WIDTH))
+        self.visited_tiles = set()
+        self.peak_cps = 0
+        self.ticks = 0
+
+    @property
+    def finished(self):
+        return self.ticks >= self.max_ticks
+
+    def can_enter(self, x, y):
+        """Return True if the detector may move onto cell (x, y)."""
+        if not (0 <= x < self.GRID_WIDTH and 0 <= y < self.GRID_HEIGHT):
+            return False
+        return self.is_aerial or (x, y) not in self.building_features
+
+    def step(self, dx=0, dy=0):
+        """Advance one tick, moving by (dx, dy) if allowed, and return the reading taken."""
+        new_x, new_y = self.car_x + dx, self.car_y + dy
+        if self.can_enter(new_x, new_y):
+            self.car_x, self.car_y = new_x, new_y
+
+        counts = min(10000, self.rng.poisson(self.rate_field[self.car_y, self.car_x]))
+        self.count_data[self.car_y, self.car_x] = counts
+        self.visited_tiles.add((self.car_x, self.car_y))
+        if counts > self.peak_cps:
+            self.peak_cps = counts
+        self.ticks += 1
+        return counts
+
+    def run(self, moves):
+        """Step through an iterable of (dx, dy) moves until it is exhausted or time runs out.
+        moves may be a generator that inspects the simulation between steps.
+        Returns count_data."""
+        for dx, dy in moves:
+            if self.finished:
+                break
+            self.step(dx, dy)
+        return self.count_data
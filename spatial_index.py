@@ -0,0 +1,56 @@
+"""Grid-bucket spatial index for sources and walls on the tile grid.
+
+Points are kept in square buckets of bucket_size tiles, so finding the points near a
+tile only looks at the few buckets that overlap the query square, however many points
+there are. Walls are kept in a set. Distances are Chebyshev (max(|dx|, |dy|)), the
+square neighbourhoods the game already uses for "next to a source" and source spacing.
+
+    index = SpatialIndex(walls=building_features)
+    if not index.too_close(x, y, 4):
+        index.insert(x, y, i)
+    nearby = index.within(car_x, car_y, 1)
+"""
+
+
+class SpatialIndex:
+    """Points (with an optional item each) and walls on the tile grid, bucketed for
+    constant-time neighbourhood queries at radii up to about bucket_size."""
+
+    def __init__(self, bucket_size=4, walls=()):
+        self.bucket_size = bucket_size
+        self.walls = set(walls)
+        self._buckets = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def insert(self, x, y, item=None):
+        """Add a point at tile (x, y), carrying item (e.g. its index in a list of sources)."""
+        key = (x // self.bucket_size, y // self.bucket_size)
+        self._buckets.setdefault(key, []).append((x, y, item))
+        self._count += 1
+
+    def within(self, x, y, radius):
+        """Return the items of the points within radius of (x, y), in insertion order per
+        bucket, as a list of (x, y, item)."""
+        size = self.bucket_size
+        found = []
+        for bx in range((x - radius) // size, (x + radius) // size + 1):
+            for by in range((y - radius) // size, (y + radius) // size + 1):
+                for point in self._buckets.get((bx, by), ()):
+                    if abs(point[0] - x) <= radius and abs(point[1] - y) <= radius:
+                        found.append(point)
+        return found
+
+    def nearest_item_within(self, x, y, radius):
+        """Return the item of the closest point within radius of (x, y), ties going to the
+        smallest item, or None if there is none."""
+        found = self.within(x, y, radius)
+        if not found:
+            return None
+        return min(found, key=lambda point: (max(abs(point[0] - x), abs(point[1] - y)), point[2]))[2]
+
+    def too_close(self, x, y, separation):
+        """Return True if (x, y) is a wall or lies less than separation from a point."""
+        return (x, y) in self.walls or bool(self.within(x, y, separation - 1))
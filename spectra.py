@@ -0,0 +1,254 @@
+"""Simulated gamma-ray spectra for the Spectrum ID and Teaching modes.
+
+Every isotope is described by data in ISOTOPES rather than code: its gamma lines, its
+continuum components and how its plot is labelled. The expected spectrum of each isotope
+is built once and cached, and a measurement is a single Poisson draw over all bins.
+
+matplotlib is only imported when a plot is actually exported, as importing it dominates
+start-up time.
+"""
+import functools
+import os
+import threading
+import numpy as np
+
+ENERGY_BINS = np.linspace(0, 2000, 1024)
+
+# Continuum component shapes, evaluated over the energy bins (keV):
+# - ("const", amp)
+# - ("exp", amp, decay): amp * exp(-E / decay)
+# - ("linear", amp, slope, edge): amp * (1 + slope * E / edge) below the edge
+# - ("exp_tail", amp, decay, start, end): amp * exp(-(E - start) / decay) between start and end
+_CONTINUUM_SHAPES = {
+    "const": lambda e, amp: np.full_like(e, amp),
+    "exp": lambda e, amp, decay: amp * np.exp(-e / decay),
+    "linear": lambda e, amp, slope, edge: np.where(e < edge, amp * (1 + slope * e / edge), 0),
+    "exp_tail": lambda e, amp, decay, start, end: np.where(
+        (e >= start) & (e < end), amp * np.exp(-(e - start) / decay), 0),
+}
+
+# Room background present in every measurement
+BACKGROUND = [("exp", 20, 300), ("const", 3)]
+
+# lines: (energy keV, amplitude, sigma keV) Gaussian peaks
+# continua: continuum components, see _CONTINUUM_SHAPES
+# xlim: upper energy shown on plots
+# annotations: (energy keV, label, text x offset, text y scale, text y offset, font size)
+ISOTOPES = {
+    "Cs-137": {
+        "lines": [
+            (662, 500, 12),     # photopeak
+            (184, 80, 20),      # backscatter peak
+        ],
+        "continua": [
+            ("linear", 60, 0.3, 477),           # Compton continuum below the 477 keV edge
+            ("exp_tail", 10, 30, 477, 662),     # falling edge up to the photopeak
+        ],
+        "xlim": 1000,
+        "annotations": [(662, "662 keV", 118, 0.85, 0, 12)],
+    },
+    "Co-60": {
+        "lines": [
+            (1173, 400, 15),
+            (1332, 350, 16),
+            (214, 60, 25),      # backscatter peak
+        ],
+        "continua": [
+            ("linear", 50, 0.2, 963),
+            ("linear", 40, 0.2, 1118),
+        ],
+        "xlim": 1600,
+        "annotations": [
+            (1173, "1173 keV", -153, 1.15, 0, 12),
+            (1332, "1332 keV", 118, 1.15, 0, 12),
+        ],
+    },
+    "Eu-152": {
+        "lines": [
+            (121.8, 350, 5),
+            (244.7, 120, 7),
+            (344.3, 320, 8),
+            (411.1, 50, 9),
+            (443.9, 60, 9),
+            (778.9, 160, 12),
+            (867.4, 55, 13),
+            (964.1, 180, 14),
+            (1085.8, 130, 15),
+            (1112.1, 170, 15),
+            (1408.0, 250, 17),
+        ],
+        "continua": [
+            ("linear", 40, 0.3, 500),
+            ("linear", 25, 0.15, 900),
+        ],
+        "xlim": 1600,
+        "annotations": [
+            (121.8, "122 keV", 40, 1.1, 15, 9),
+            (344.3, "344 keV", 40, 1.1, 15, 9),
+            (778.9, "779 keV", 40, 1.1, 15, 9),
+            (964.1, "964 keV", 40, 1.1, 15, 9),
+            (1112.1, "1112 keV", 40, 1.1, 15, 9),
+            (1408.0, "1408 keV", 40, 1.1, 15, 9),
+        ],
+    },
+    "Nat. Uranium": {
+        # U-238 decay chain (Th-234, Pb-214, Bi-214, Pa-234m) plus U-235
+        "lines": [
+            (63.3, 200, 4),     # Th-234
+            (92.4, 300, 4.5),   # Th-234
+            (92.8, 250, 4.5),   # Th-234
+            (185.7, 280, 6),    # U-235
+            (242, 80, 7),       # Pb-214
+            (295.2, 180, 8),    # Pb-214
+            (351.9, 340, 8),    # Pb-214
+            (609.3, 400, 11),   # Bi-214
+            (768.4, 60, 12),    # Bi-214
+            (1001.0, 120, 14),  # Pa-234m
+            (1120.3, 150, 15),  # Bi-214
+            (1238.1, 70, 16),   # Bi-214
+            (1764.5, 180, 18),  # Bi-214
+        ],
+        "continua": [
+            ("exp", 80, 150),   # low-energy continuum from beta and scatter
+        ],
+        "xlim": 2000,
+        "annotations": [
+            (92.4, "92 keV\n(Th-234)", 50, 1.1, 15, 9),
+            (185.7, "186 keV\n(U-235)", 50, 1.1, 15, 9),
+            (351.9, "352 keV\n(Pb-214)", 50, 1.1, 15, 9),
+            (609.3, "609 keV\n(Bi-214)", 50, 1.1, 15, 9),
+            (1001.0, "1001 keV\n(Pa-234m)", 50, 1.1, 15, 9),
+            (1764.5, "1765 keV\n(Bi-214)", 50, 1.1, 15, 9),
+        ],
+    },
+}
+
+
+def _evaluate_continua(components):
+    total = np.zeros_like(ENERGY_BINS)
+    for shape, *params in components:
+        total += _CONTINUUM_SHAPES[shape](ENERGY_BINS, *params)
+    return total
+
+
+@functools.lru_cache(maxsize=None)
+def isotope_template(isotope):
+    """Return the expected counts per bin for an isotope, background included.
+    Built once per isotope; the returned array is read-only."""
+    entry = ISOTOPES[isotope]
+    lines = np.array(entry["lines"], dtype=float)
+    energies, amplitudes, sigmas = lines[:, 0:1], lines[:, 1:2], lines[:, 2:3]
+    peaks = amplitudes * np.exp(-0.5 * ((ENERGY_BINS - energies) / sigmas) ** 2)
+    template = peaks.sum(axis=0) + _evaluate_continua(BACKGROUND + entry["continua"])
+    template = template.clip(min=0)
+    template.setflags(write=False)
+    return template
+
+
+def sample_spectrum(isotope, rng=None):
+    """Simulate one measured spectrum with the numpy Generator rng; returns (energy_bins, counts).
+    A sum of Poisson draws is Poisson, so one draw on the template replaces a draw per component."""
+    rng = rng if rng is not None else np.random.default_rng()
+    return ENERGY_BINS, rng.poisson(isotope_template(isotope)).astype(float)
+
+
+# Non-paralyzable detector dead time per recorded event (s)
+DEAD_TIME = 10e-6
+# Upper bound on the events binned in one accumulate() call
+MAX_EVENTS_PER_TICK = 1 << 16
+
+
+class SpectrumAccumulator:
+    """Builds up a measured spectrum tick by tick, as a detector acquiring it would.
+
+    Each tick records a Poisson number of events at the detector's count rate, reduced by
+    dead time, and bins them into a preallocated histogram by inverse-CDF sampling of the
+    isotope template. Nothing is allocated per tick except the bin indices of the new
+    events, so accumulate() can run every frame."""
+
+    def __init__(self, isotope, dead_time=DEAD_TIME, max_events_per_tick=MAX_EVENTS_PER_TICK, rng=None):
+        self.isotope = isotope
+        self.dead_time = dead_time
+        self.rng = rng if rng is not None else np.random.default_rng()
+        template = isotope_template(isotope)
+        self._cdf = np.cumsum(template) / template.sum()
+        self._cdf[-1] = 1.0
+        self._uniform = np.empty(max_events_per_tick)
+        self.counts = np.zeros_like(ENERGY_BINS)
+        # Copy of counts that a renderer on another thread can read while acquisition goes on
+        self.snapshot = np.zeros_like(ENERGY_BINS)
+        self.real_time = 0.0
+        self.live_time = 0.0
+        self.total_counts = 0
+
+    def accumulate(self, count_rate, dt):
+        """Acquire for dt seconds of real time at count_rate (true counts per second)."""
+        live_fraction = 1.0 / (1.0 + count_rate * self.dead_time)
+        self.real_time += dt
+        self.live_time += dt * live_fraction
+        n = min(int(self.rng.poisson(count_rate * live_fraction * dt)), len(self._uniform))
+        if n == 0:
+            return
+        uniform = self._uniform[:n]
+        self.rng.random(out=uniform)
+        np.add.at(self.counts, self._cdf.searchsorted(uniform, side="right"), 1)
+        self.total_counts += n
+
+    def take_snapshot(self):
+        """Copy the current histogram into snapshot and return it."""
+        np.copyto(self.snapshot, self.counts)
+        return self.snapshot
+
+    @property
+    def dead_time_fraction(self):
+        if self.real_time == 0:
+            return 0.0
+        return 1.0 - self.live_time / self.real_time
+
+
+def save_spectrum_plot(energy_bins, spectrum, isotope, filepath):
+    """Plot a measured spectrum with its peak annotations and save it as an image.
+    Uses a standalone Figure rather than pyplot, so it is safe to call from a worker thread."""
+    from matplotlib.figure import Figure
+
+    entry = ISOTOPES[isotope]
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(energy_bins, spectrum, 'b-', linewidth=0.8)
+    ax.fill_between(energy_bins, spectrum, alpha=0.3, color='blue')
+    ax.set_xlabel('Energy (keV)', fontsize=14)
+    ax.set_ylabel('Counts', fontsize=14)
+    ax.set_title(f'Measured Spectrum: {isotope}', fontsize=16)
+    ax.set_xlim(0, entry["xlim"])
+    ax.set_ylim(0, None)
+    ax.grid(True, alpha=0.3)
+
+    for energy, label, dx, y_scale, y_offset, fontsize in entry["annotations"]:
+        idx = np.argmin(np.abs(energy_bins - energy))
+        ax.annotate(label, xy=(energy, spectrum[idx]),
+                    xytext=(energy + dx, spectrum[idx] * y_scale + y_offset),
+                    arrowprops=dict(arrowstyle='->', color='red'),
+                    fontsize=fontsize, color='red')
+
+    fig.tight_layout()
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(filepath, dpi=100)
+
+
+def export_spectrum_png_async(energy_bins, spectrum, isotope, filepath):
+    """Save a spectrum plot on a background thread so the game loop never waits for it.
+    Returns the started thread."""
+    thread = threading.Thread(target=save_spectrum_plot, args=(energy_bins, spectrum.copy(), isotope, filepath),
+                              daemon=True)
+    thread.start()
+    return thread
+
+
+def generate_and_save_spectrum(isotope, filepath, rng=None):
+    """Generate a simulated gamma-ray spectrum for a given isotope and save as image.
+    Returns the (energy_bins, spectrum) that was plotted."""
+    energy_bins, spectrum = sample_spectrum(isotope, rng)
+    save_spectrum_plot(energy_bins, spectrum, isotope, filepath)
+    return energy_bins, spectrum